@@ -0,0 +1,131 @@
+"""Local stand-ins for Ollama and an MCP SSE server, used by the benchmarks."""
+
+import asyncio
+import json
+import socket
+import threading
+import time
+
+import mcp.types as types
+import uvicorn
+from mcp.server.lowlevel import Server
+from mcp.server.sse import SseServerTransport
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+FAKE_TOOL_NAME = "get_users"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve(app, port):
+    """Run an ASGI app with uvicorn on a daemon thread until the process exits."""
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="error")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+def fake_ollama_app(tool_name, latency=0.0, token_delay=0.0):
+    """
+    Scripted /api/chat endpoint:
+    - a user message with tools offered gets a call to tool_name
+    - anything else gets a short text answer
+    Responses are streamed as NDJSON when the request asks for it.
+    """
+
+    def reply(body):
+        last = body["messages"][-1]
+        if body.get("tools") and last["role"] == "user":
+            return {
+                "role": "assistant",
+                "content": "",
+                "tool_calls": [
+                    {"function": {"name": tool_name, "arguments": {"limit": 10}}}
+                ],
+            }
+        if last["role"] == "tool":
+            return {"role": "assistant", "content": "Here are the users you asked for."}
+        return {"role": "assistant", "content": "Hello! I am a scripted benchmark model."}
+
+    async def chat(request: Request):
+        body = await request.json()
+        await asyncio.sleep(latency)
+        message = reply(body)
+        base = {"model": body["model"], "created_at": "2025-01-01T00:00:00Z"}
+        if not body.get("stream", True):
+            return JSONResponse({**base, "message": message, "done": True})
+
+        async def chunks():
+            words = message["content"].split(" ") if message["content"] else []
+            for i, word in enumerate(words):
+                delta = word if i == 0 else f" {word}"
+                yield json.dumps(
+                    {**base, "message": {"role": "assistant", "content": delta}, "done": False}
+                ) + "\n"
+                await asyncio.sleep(token_delay)
+            final = {"role": "assistant", "content": ""}
+            if "tool_calls" in message:
+                final["tool_calls"] = message["tool_calls"]
+            yield json.dumps({**base, "message": final, "done": True}) + "\n"
+
+        return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+    return Starlette(routes=[Route("/api/chat", chat, methods=["POST"])])
+
+
+def fake_mcp_app(latency=0.0, users=50, progress_steps=0):
+    """
+    MCP server over SSE exposing a single get_users tool.
+    With progress_steps, calls that ask for progress get that many
+    notifications (progress 1..progress_steps of total progress_steps).
+    """
+    server = Server("bench")
+    sse = SseServerTransport("/messages/")
+
+    @server.list_tools()
+    async def list_tools():
+        return [
+            types.Tool(
+                name=FAKE_TOOL_NAME,
+                description="List users in the workspace",
+                inputSchema={
+                    "type": "object",
+                    "properties": {"limit": {"type": "integer"}},
+                },
+            )
+        ]
+
+    @server.call_tool()
+    async def call_tool(name, arguments):
+        context = server.request_context
+        token = context.meta.progressToken if context.meta else None
+        for step in range(1, progress_steps + 1):
+            if token is not None:
+                await context.session.send_progress_notification(token, step, progress_steps)
+            await asyncio.sleep(latency / progress_steps)
+        if not progress_steps:
+            await asyncio.sleep(latency)
+        limit = min(arguments.get("limit", users), users)
+        payload = {"ok": True, "members": [{"id": f"U{i}", "name": f"user{i}"} for i in range(limit)]}
+        return [types.TextContent(type="text", text=json.dumps(payload))]
+
+    async def handle_sse(request):
+        async with sse.connect_sse(request.scope, request.receive, request._send) as streams:
+            await server.run(streams[0], streams[1], server.create_initialization_options())
+
+    return Starlette(
+        routes=[
+            Route("/sse", endpoint=handle_sse),
+            Mount("/messages/", app=sse.handle_post_message),
+        ]
+    )
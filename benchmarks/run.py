@@ -0,0 +1,205 @@
+"""
+Measure Jarbas against local fake Ollama and MCP servers, with no network.
+
+usage: python -m benchmarks.run [--iterations N] [--concurrency N]
+                                [--llm-latency S] [--token-delay S]
+                                [--tool-latency S] [--json]
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import tempfile
+import time
+
+import yaml
+
+from benchmarks import fakes
+from jarbas import configs, llms, tooledchat, tools
+
+PROVIDER = "fake-ollama"
+MODEL = "bench-model"
+SERVER = "bench"
+AGENT = "bench"
+
+
+def write_config(ollama_port, mcp_port):
+    config = {
+        "mcp_serrvers": [{"name": SERVER, "url": f"http://127.0.0.1:{mcp_port}/sse"}],
+        "llm_providers": [
+            {"name": PROVIDER, "type": "ollama", "url": f"http://127.0.0.1:{ollama_port}"}
+        ],
+        "agents": [
+            {
+                "name": AGENT,
+                "system_content": "You are a benchmark agent.",
+                "enable_tools": True,
+                "tools": [f"{SERVER}.*"],
+            }
+        ],
+        "default_model": f"{PROVIDER}/{MODEL}",
+        "default_agent": AGENT,
+    }
+    with tempfile.NamedTemporaryFile("w", suffix=".yaml", delete=False) as file:
+        yaml.dump(config, file)
+        return file.name
+
+
+def percentile(samples, p):
+    # Nearest rank: the smallest sample with at least p% of samples at or below it
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, math.ceil(p * len(ordered) / 100) - 1))
+    return ordered[index]
+
+
+def result(name, samples, wall=None):
+    # Without wall there is no meaningful throughput (e.g. a phase of a request)
+    return {
+        "name": name,
+        "iterations": len(samples),
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "throughput_per_s": len(samples) / wall if wall else None,
+    }
+
+
+def measure(name, fn, iterations):
+    samples = []
+    wall_start = time.perf_counter()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return result(name, samples, time.perf_counter() - wall_start)
+
+
+async def ameasure(name, coro_fn, iterations, concurrency=1):
+    samples = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed():
+        async with semaphore:
+            start = time.perf_counter()
+            await coro_fn()
+            samples.append(time.perf_counter() - start)
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(timed() for _ in range(iterations)))
+    return result(name, samples, time.perf_counter() - wall_start)
+
+
+async def tool_benchmarks(iterations, concurrency):
+    tool_name = f"{SERVER}.{fakes.FAKE_TOOL_NAME}"
+
+    async def cold_init():
+        await tools.close_sessions()
+        tools.tools = {}
+        await tools.init()
+
+    async def call():
+        await tools.call_tool(tool_name, {"limit": 10})
+
+    results = [await ameasure("tools.init (cold)", cold_init, iterations)]
+    await call()
+    results.append(await ameasure("tools.call_tool (warm)", call, iterations))
+    results.append(
+        await ameasure(
+            f"tools.call_tool x{concurrency} concurrent", call, iterations, concurrency
+        )
+    )
+    await tools.close_sessions()
+    return results
+
+
+def llm_benchmarks(iterations):
+    messages = [{"role": "user", "content": "Hello, what is your name?"}]
+
+    def chat():
+        llms.chat(PROVIDER, MODEL, messages, bypass_cache=True)
+
+    first_token_samples = []
+
+    def stream_chat():
+        start = time.perf_counter()
+        events = llms.chat(PROVIDER, MODEL, messages, stream=True, bypass_cache=True)
+        next(events)
+        first_token_samples.append(time.perf_counter() - start)
+        for _ in events:
+            pass
+
+    results = [
+        measure("llms.chat", chat, iterations),
+        measure("llms.chat (stream, full)", stream_chat, iterations),
+    ]
+    results.append(
+        result("llms.chat (stream, first token)", first_token_samples)
+    )
+    return results
+
+
+def turn_benchmarks(iterations):
+    tooledchat.init()
+    tooledchat.set_agent(AGENT)
+    tooledchat.set_provider_and_model(PROVIDER, MODEL)
+
+    def turn():
+        tooledchat.start_chat(AGENT, "list the users in the workspace")
+
+    turn()
+    return [measure("tooledchat.chat (tool turn)", turn, iterations)]
+
+
+def report(results):
+    header = f"{'benchmark':<36}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/s':>10}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        throughput = r["throughput_per_s"]
+        print(
+            f"{r['name']:<36}{r['iterations']:>6}{r['p50_ms']:>10.2f}"
+            f"{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+            + (f"{throughput:>10.1f}" if throughput is not None else f"{'-':>10}")
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--llm-latency", type=float, default=0.0,
+                        help="seconds the fake Ollama waits before answering")
+    parser.add_argument("--token-delay", type=float, default=0.0,
+                        help="seconds between streamed tokens from the fake Ollama")
+    parser.add_argument("--tool-latency", type=float, default=0.0,
+                        help="seconds the fake MCP tool takes to run")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    ollama_port, mcp_port = fakes.free_port(), fakes.free_port()
+    fakes.serve(
+        fakes.fake_ollama_app(
+            f"{SERVER}.{fakes.FAKE_TOOL_NAME}", args.llm_latency, args.token_delay
+        ),
+        ollama_port,
+    )
+    fakes.serve(fakes.fake_mcp_app(args.tool_latency), mcp_port)
+    config_path = write_config(ollama_port, mcp_port)
+    try:
+        configs.init(config_path)
+        results = asyncio.run(tool_benchmarks(args.iterations, args.concurrency))
+        results += llm_benchmarks(args.iterations)
+        results += turn_benchmarks(args.iterations)
+    finally:
+        os.remove(config_path)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        report(results)
+
+
+if __name__ == "__main__":
+    main()
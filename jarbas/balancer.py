@@ -0,0 +1,120 @@
+import threading
+import time
+
+DEFAULT_EJECT_AFTER_FAILURES = 3
+DEFAULT_EJECT_SECONDS = 30
+DEFAULT_AFFINITY_WEIGHT = 2
+
+_pools = {}
+_lock = threading.Lock()
+
+
+class Backend:
+    """One Ollama endpoint of an ollama-pool provider, with its routing state."""
+
+    def __init__(self, pool_provider, backend):
+        options = {k: v for k, v in pool_provider.items() if k != "backends"}
+        options.update(backend)
+        self.url = backend["url"]
+        # Looks like a plain ollama provider, so llms pools a client per backend
+        self.provider = {
+            **options,
+            "name": f"{pool_provider['name']}@{self.url}",
+            "type": "ollama",
+        }
+        self.outstanding = 0
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.models = set()
+        self.last_picked = 0.0
+
+    def healthy(self, now):
+        return self.ejected_until <= now
+
+
+def _get_backends(_provider):
+    pool = _pools.get(_provider["name"])
+    # A reloaded config brings a new provider dict, and a fresh pool with it
+    if pool is None or pool["provider"] is not _provider:
+        pool = {
+            "provider": _provider,
+            "backends": [Backend(_provider, b) for b in _provider["backends"]],
+        }
+        _pools[_provider["name"]] = pool
+    return pool["backends"]
+
+
+def acquire(_provider, model):
+    """
+    Pick the backend for a request and count it as outstanding until release.
+    Healthy backends with the fewest requests in flight win; a backend that
+    has already served the model (so likely has it loaded) counts as if it had
+    affinity_weight fewer. When every backend is ejected, all are tried.
+    """
+    weight = _provider.get("affinity_weight", DEFAULT_AFFINITY_WEIGHT)
+    now = time.monotonic()
+    with _lock:
+        backends = _get_backends(_provider)
+        candidates = [b for b in backends if b.healthy(now)] or backends
+        backend = min(
+            candidates,
+            key=lambda b: (
+                b.outstanding - (weight if model in b.models else 0),
+                b.last_picked,
+            ),
+        )
+        backend.outstanding += 1
+        backend.last_picked = now
+        return backend
+
+
+def release(_provider, backend, model, ok):
+    """
+    Finish a request; failures past eject_after_failures in a row take the
+    backend out of rotation for eject_seconds.
+    """
+    with _lock:
+        backend.outstanding -= 1
+        if ok:
+            backend.failures = 0
+            backend.models.add(model)
+            return
+        backend.failures += 1
+        backend.models.discard(model)
+        if backend.failures >= _provider.get(
+            "eject_after_failures", DEFAULT_EJECT_AFTER_FAILURES
+        ):
+            backend.ejected_until = time.monotonic() + _provider.get(
+                "eject_seconds", DEFAULT_EJECT_SECONDS
+            )
+
+
+def backends(_provider):
+    """
+    Every backend of an ollama-pool provider
+    """
+    with _lock:
+        return list(_get_backends(_provider))
+
+
+def mark_loaded(backend, model):
+    with _lock:
+        backend.models.add(model)
+
+
+def stats(_provider):
+    """
+    Routing state of each backend of an ollama-pool provider
+    """
+    now = time.monotonic()
+    with _lock:
+        return [
+            {
+                "url": b.url,
+                "outstanding": b.outstanding,
+                "failures": b.failures,
+                "healthy": b.healthy(now),
+                "models": sorted(b.models),
+            }
+            for b in _get_backends(_provider)
+        ]
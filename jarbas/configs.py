@@ -1,36 +1,154 @@
 import os
+import threading
 import yaml
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional
 
 _config = None
 _config_file_path = "config.yaml"
+_loaded_path = _config_file_path
+_loaded_stat = None
+# The config the indexes were built from, and section -> name -> entry
+_indexes = (None, {})
+_listeners = []
+_watch_stop = None
+
+DEFAULT_MAX_CONCURRENT_TOOL_CALLS = 4
+DEFAULT_RELOAD_INTERVAL = 2
+
+# Sections that are lists of entries with a unique "name"
+_NAMED_SECTIONS = {
+    "mcp_servers": "mcp_serrvers",
+    "agents": "agents",
+    "llm_providers": "llm_providers",
+}
 
 
 def init(config_path: str = _config_file_path) -> None:
-    global _config
+    global _config, _loaded_path, _loaded_stat
+    _config = _read(config_path)
+    _loaded_path = config_path
+    _loaded_stat = _file_stat(config_path)
+
+
+def _read(config_path: str) -> Dict[str, Any]:
     try:
         with open(config_path, "r") as file:
-            _config = yaml.safe_load(file)
+            return yaml.safe_load(file)
     except FileNotFoundError:
         raise FileNotFoundError(f"Config file not found: {config_path}")
 
 
+def _file_stat(config_path: str):
+    try:
+        stat = os.stat(config_path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _index(section: str) -> Dict[str, Dict[str, Any]]:
+    # Rebuilt whenever _config is replaced (init, reload, or patched in tests)
+    global _indexes
+    config, indexes = _indexes
+    if config is not _config or not indexes:
+        config = _config
+        indexes = {
+            key: {entry["name"]: entry for entry in (config or {}).get(yaml_key) or []}
+            for key, yaml_key in _NAMED_SECTIONS.items()
+        }
+        _indexes = (config, indexes)
+    return indexes[section]
+
+
 def get_mcp_servers() -> List[Dict[str, str]]:
     if _config is None or "mcp_serrvers" not in _config:
         return []
     return _config["mcp_serrvers"]
 
 
+def get_mcp_pool_settings() -> Dict[str, Any]:
+    if _config is None or "mcp_pool" not in _config:
+        return {}
+    return _config["mcp_pool"]
+
+
+def get_tool_cache_settings() -> Dict[str, Any]:
+    if _config is None or "tool_cache" not in _config:
+        return {}
+    return _config["tool_cache"]
+
+
+def get_llm_cache_settings() -> Dict[str, Any]:
+    if _config is None or "llm_cache" not in _config:
+        return {}
+    return _config["llm_cache"]
+
+
+def get_context_budget(model: str) -> Optional[int]:
+    if _config is None or not _config.get("context_window"):
+        return None
+    context_window = _config["context_window"]
+    return (context_window.get("models") or {}).get(model, context_window.get("max_tokens"))
+
+
+def get_tool_results_settings() -> Dict[str, Any]:
+    if _config is None or "tool_results" not in _config:
+        return {}
+    return _config["tool_results"]
+
+
+def get_max_concurrent_tool_calls() -> int:
+    if _config is None or "max_concurrent_tool_calls" not in _config:
+        return DEFAULT_MAX_CONCURRENT_TOOL_CALLS
+    return _config["max_concurrent_tool_calls"]
+
+
+def get_conversation_store_settings() -> Dict[str, Any]:
+    if _config is None or "conversation_store" not in _config:
+        return {}
+    return _config["conversation_store"]
+
+
+def get_warmup_settings() -> Dict[str, Any]:
+    if _config is None or "warmup" not in _config:
+        return {}
+    return _config["warmup"]
+
+
+def get_api_settings() -> Dict[str, Any]:
+    if _config is None or "api" not in _config:
+        return {}
+    return _config["api"]
+
+
+def get_tool_catalog_cache_settings() -> Dict[str, Any]:
+    if _config is None or "tool_catalog_cache" not in _config:
+        return {}
+    return _config["tool_catalog_cache"]
+
+
+def get_config_reload_settings() -> Dict[str, Any]:
+    if _config is None or "config_reload" not in _config:
+        return {}
+    return _config["config_reload"]
+
+
 def get_agents() -> List[Dict[str, Any]]:
     if _config is None or "agents" not in _config:
         return []
     return _config["agents"]
 
 
+def get_agent(agent_name: str) -> Optional[Dict[str, Any]]:
+    return _index("agents").get(agent_name)
+
+
+def get_mcp_server(server_name: str) -> Optional[Dict[str, Any]]:
+    return _index("mcp_servers").get(server_name)
+
+
 def get_llm_provider(provider: str) -> Optional[Dict[str, Any]]:
-    if _config is None or "llm_providers" not in _config:
-        return None
-    return next((p for p in _config["llm_providers"] if p["name"] == provider), None)
+    return _index("llm_providers").get(provider)
 
 
 def get_default_model() -> Optional[str]:
@@ -48,9 +166,7 @@ def get_default_agent() -> Optional[str]:
 def set_default_agent(agent_name: str) -> None:
     if _config is None:
         init()
-    agents = get_agents()
-    agent_names = [agent["name"] for agent in agents]
-    if agent_name not in agent_names:
+    if get_agent(agent_name) is None:
         raise ValueError(f"Agent '{agent_name}' not found")
     _config["default_agent"] = agent_name
     _save_config()
@@ -64,5 +180,124 @@ def set_default_model(model_name: str) -> None:
 
 
 def _save_config(config_path: str = _config_file_path) -> None:
-    with open(config_path, "w") as file:
-        yaml.dump(_config, file, default_flow_style=False) 
\ No newline at end of file
+    global _loaded_stat
+    # Renamed over the original, so nobody ever reads a half-written file
+    tmp_path = f"{config_path}.tmp"
+    with open(tmp_path, "w") as file:
+        yaml.dump(_config, file, default_flow_style=False)
+    os.replace(tmp_path, config_path)
+    if config_path == _loaded_path:
+        # Our own write is not a change to reload
+        _loaded_stat = _file_stat(config_path)
+
+
+def add_listener(listener: Callable[[Dict[str, Any]], None]) -> None:
+    """
+    Call listener(changes) after every reload that changed something;
+    changes is what diff returns
+    """
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def diff(old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    What differs between two configs: for mcp_servers, agents and
+    llm_providers the names added, removed and changed; under "settings" the
+    other top-level keys whose value changed
+    example:
+    - {"mcp_servers": {"added": ["github"], "removed": [], "changed": []}, ...,
+       "settings": ["default_model"]}
+    """
+    old, new = old or {}, new or {}
+    changes = {}
+    for key, yaml_key in _NAMED_SECTIONS.items():
+        before = {entry["name"]: entry for entry in old.get(yaml_key) or []}
+        after = {entry["name"]: entry for entry in new.get(yaml_key) or []}
+        changes[key] = {
+            "added": [name for name in after if name not in before],
+            "removed": [name for name in before if name not in after],
+            "changed": [name for name in after if name in before and after[name] != before[name]],
+        }
+    changes["settings"] = sorted(
+        key
+        for key in set(old) | set(new)
+        if key not in _NAMED_SECTIONS.values() and old.get(key) != new.get(key)
+    )
+    return changes
+
+
+def _has_changes(changes: Dict[str, Any]) -> bool:
+    return bool(changes["settings"]) or any(
+        any(changes[key].values()) for key in _NAMED_SECTIONS
+    )
+
+
+def reload() -> Dict[str, Any]:
+    """
+    Re-read the config file and apply it without a restart.
+    Entries and settings that didn't change keep their identity, so whatever
+    was built from them (client pools, balancers, stores) stays; listeners
+    are told what did change. Returns the changes.
+    """
+    global _config
+    new_config = _read(_loaded_path)
+    if not isinstance(new_config, dict) or not new_config:
+        # Most likely caught mid-write; applying it would drop everything
+        raise ValueError(f"{_loaded_path} is empty or not a mapping")
+    old_config = _config or {}
+    for key, value in new_config.items():
+        if key in _NAMED_SECTIONS.values():
+            before = {entry["name"]: entry for entry in old_config.get(key) or []}
+            new_config[key] = [
+                before[entry["name"]] if before.get(entry["name"]) == entry else entry
+                for entry in value or []
+            ]
+        elif old_config.get(key) == value:
+            new_config[key] = old_config[key]
+    changes = diff(old_config, new_config)
+    if not _has_changes(changes):
+        return changes
+    _config = new_config
+    for listener in list(_listeners):
+        try:
+            listener(changes)
+        except Exception as e:
+            print(f"Error applying config change in {listener.__module__}: {e}")
+    return changes
+
+
+def watch(interval: float = DEFAULT_RELOAD_INTERVAL) -> None:
+    """
+    Reload the config file whenever it changes on disk, checking every
+    interval seconds in a background thread; one watcher per process
+    """
+    global _watch_stop
+    if _watch_stop is not None and not _watch_stop.is_set():
+        return
+    stop = _watch_stop = threading.Event()
+    threading.Thread(
+        target=_watch, args=(stop, interval), name="jarbas-config-watch", daemon=True
+    ).start()
+
+
+def stop_watching() -> None:
+    if _watch_stop is not None:
+        _watch_stop.set()
+
+
+def _watch(stop: threading.Event, interval: float) -> None:
+    global _loaded_stat
+    while not stop.wait(interval):
+        stat = _file_stat(_loaded_path)
+        if stat is None or stat == _loaded_stat:
+            continue  # unchanged, or mid-replace by an editor
+        _loaded_stat = stat
+        try:
+            changes = reload()
+        except Exception as e:
+            # Most likely a half-edited file; the next save is picked up
+            print(f"Could not reload {_loaded_path}: {e}")
+            continue
+        if _has_changes(changes):
+            print(f"Reloaded {_loaded_path}") 
\ No newline at end of file
@@ -0,0 +1,85 @@
+import json
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+SUMMARY_QUESTION_CHARS = 120
+SUMMARY_MAX_QUESTIONS = 5
+
+
+def count_tokens(message):
+    """
+    Estimate the tokens a message costs; ollama exposes no tokenizer, so this
+    uses the usual ~4 characters per token heuristic.
+    """
+    size = len(message.get("content") or "")
+    if message.get("tool_calls"):
+        size += len(json.dumps(message["tool_calls"], default=str))
+    return size // CHARS_PER_TOKEN + MESSAGE_OVERHEAD_TOKENS
+
+
+def fit(messages, max_tokens, tools=None):
+    """
+    Trim a conversation to fit max_tokens before sending it to the model.
+    Leading system messages and the current turn (the last user message and
+    every tool exchange after it) are always kept; older turns are dropped
+    oldest first and replaced by a short note listing the most recent
+    questions the user asked in them.
+    """
+    if not max_tokens:
+        return messages
+    budget = max_tokens
+    if tools:
+        budget -= len(json.dumps(tools, default=str)) // CHARS_PER_TOKEN
+    if sum(count_tokens(m) for m in messages) <= budget:
+        return messages
+
+    head = 0
+    while head < len(messages) and messages[head]["role"] == "system":
+        head += 1
+    system, turns = messages[:head], _split_turns(messages[head:])
+    if not turns:
+        return messages
+    used = sum(count_tokens(m) for m in system) + sum(
+        count_tokens(m) for m in turns[-1]
+    )
+    kept = []
+    for turn in reversed(turns[:-1]):
+        cost = sum(count_tokens(m) for m in turn)
+        if used + cost > budget:
+            break
+        kept.insert(0, turn)
+        used += cost
+    dropped = turns[: len(turns) - 1 - len(kept)]
+    if not dropped:
+        return messages
+    summary = _summary(dropped)
+    while kept and used + count_tokens(summary) > budget:
+        used -= sum(count_tokens(m) for m in kept[0])
+        dropped.append(kept.pop(0))
+        summary = _summary(dropped)
+    result = system + [summary]
+    for turn in kept + turns[-1:]:
+        result.extend(turn)
+    return result
+
+
+def _split_turns(messages):
+    turns = []
+    for message in messages:
+        if message["role"] == "user" or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def _summary(dropped_turns):
+    questions = [
+        turn[0]["content"][:SUMMARY_QUESTION_CHARS]
+        for turn in dropped_turns
+        if turn[0]["role"] == "user" and turn[0].get("content")
+    ][-SUMMARY_MAX_QUESTIONS:]
+    count = sum(len(turn) for turn in dropped_turns)
+    content = f"[{count} earlier messages were omitted to fit the context window.]"
+    if questions:
+        content += " Earlier the user asked: " + " | ".join(questions)
+    return {"role": "system", "content": content}
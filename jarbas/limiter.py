@@ -0,0 +1,144 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+class QueueFullError(RuntimeError):
+    """Raised instead of queueing a request behind a full queue."""
+
+
+class _Waiter:
+    def __init__(self, loop=None):
+        self.granted = False
+        self.loop = loop
+        self.event = threading.Event() if loop is None else None
+        self.future = loop.create_future() if loop is not None else None
+
+    def grant(self):
+        # Called with the limiter lock held; the slot now belongs to the waiter
+        if self.loop is None:
+            self.granted = True
+            self.event.set()
+            return True
+        try:
+            self.loop.call_soon_threadsafe(self._resolve)
+        except RuntimeError:
+            return False  # its loop is gone
+        self.granted = True
+        return True
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class Limiter:
+    """
+    At most max_in_flight requests at a time, the rest wait in FIFO order.
+    At most max_queued may wait; beyond that, acquire raises QueueFullError.
+    Works for threads and event loops alike, so sync and async callers share
+    the same slots.
+    """
+
+    def __init__(self, name, max_in_flight, max_queued=None):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.in_flight = 0
+        self.rejected = 0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    def _enter_or_wait(self, loop=None):
+        with self._lock:
+            if self.in_flight < self.max_in_flight and not self._waiters:
+                self.in_flight += 1
+                return None
+            if self.max_queued is not None and len(self._waiters) >= self.max_queued:
+                self.rejected += 1
+                raise QueueFullError(
+                    f"{self.name} is overloaded: {len(self._waiters)} requests "
+                    f"already queued behind {self.in_flight} in flight"
+                )
+            waiter = _Waiter(loop)
+            self._waiters.append(waiter)
+            return waiter
+
+    def acquire(self):
+        """
+        Block until a slot is free; returns the seconds spent queued
+        """
+        start = time.perf_counter()
+        waiter = self._enter_or_wait()
+        if waiter is not None:
+            waiter.event.wait()
+        return time.perf_counter() - start
+
+    async def aacquire(self):
+        """
+        Async counterpart of acquire
+        """
+        start = time.perf_counter()
+        waiter = self._enter_or_wait(asyncio.get_running_loop())
+        if waiter is not None:
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                with self._lock:
+                    granted = waiter.granted
+                    if not granted:
+                        self._waiters.remove(waiter)
+                if granted:
+                    # The slot was handed over just as we were cancelled
+                    self.release()
+                raise
+        return time.perf_counter() - start
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                if self._waiters.popleft().grant():
+                    return
+            self.in_flight -= 1
+
+    def stats(self):
+        return {
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "rejected": self.rejected,
+            "max_in_flight": self.max_in_flight,
+            "max_queued": self.max_queued,
+        }
+
+
+def get_limiter(_provider, model):
+    """
+    The shared limiter for a provider/model, or None when the provider sets
+    no max_in_flight
+    """
+    max_in_flight = _provider.get("max_in_flight")
+    if not max_in_flight:
+        return None
+    max_queued = _provider.get("max_queued")
+    key = (_provider["name"], model)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None or (limiter.max_in_flight, limiter.max_queued) != (
+            max_in_flight,
+            max_queued,
+        ):
+            limiter = Limiter(f"{_provider['name']}/{model}", max_in_flight, max_queued)
+            _limiters[key] = limiter
+        return limiter
+
+
+def stats():
+    """
+    Counters of every limiter in use, keyed by "provider/model"
+    """
+    with _limiters_lock:
+        return {l.name: l.stats() for l in _limiters.values()}
@@ -1,7 +1,23 @@
+import asyncio
+import hashlib
+import json
+import threading
+import httpx
 import ollama
-from jarbas import configs
+from jarbas import balancer, configs, limiter, metrics
+from jarbas.cache import LRUCache, MISSING, SqliteCache, TieredCache
 
-def chat(provider, model, messages, tools=None):
+DEFAULT_URL = "http://localhost:11434"
+PROVIDER_TYPES = ("ollama", "ollama-pool")
+DEFAULT_CACHE_ENTRIES = 256
+DEFAULT_DISK_CACHE_ENTRIES = 10000
+
+_clients = {}
+_async_clients = {}
+_clients_lock = threading.Lock()
+_response_cache = None
+
+def chat(provider, model, messages, tools=None, stream=False, bypass_cache=False):
     """
     Chat with a model, possibly with tools.
     returns the next response from the model.
@@ -15,49 +31,441 @@ def chat(provider, model, messages, tools=None):
     - _tools = tools.get_tools("slack.*", "youtube.*")
     - response = chat(model="ollama-local/qwen2.5", messages=messages, tools=_tools)
     - should return a response with a tool call
+
+    With stream=True, returns an iterator of (event_type, event_data) pairs:
+    ("token", {"content": delta}) as text arrives, then a final
+    ("message", message) with the assembled response and its tool calls.
+
+    When llm_cache is enabled, identical requests are answered from the
+    response cache; bypass_cache=True forces a fresh generation.
     """
-    # If no messages were provided, use an empty list
     _provider = configs.get_llm_provider(provider)
-    if _provider["type"] == "ollama":
-        return _chat_ollama(_provider, model, messages, tools)
+    if _provider["type"] not in PROVIDER_TYPES:
+        raise ValueError(f"Unsupported provider: {provider}")
+    key = _response_cache_key(provider, model, messages, tools, bypass_cache)
+    cached = _cached_response(key)
+    if cached is not None:
+        return _replay(cached) if stream else cached
+    if stream:
+        response = _chat_ollama(_provider, model, messages, tools, stream)
     else:
+        with metrics.span("llm.request", model=model):
+            response = _chat_ollama(_provider, model, messages, tools, stream)
+    if key is None:
+        return response
+    if stream:
+        return _caching_stream(key, response)
+    _store_response(key, response)
+    return response
+
+
+async def achat(provider, model, messages, tools=None, stream=False, bypass_cache=False):
+    """
+    Async counterpart of chat, backed by ollama.AsyncClient.
+    With stream=True, returns an async iterator of the same events as chat.
+    """
+    _provider = configs.get_llm_provider(provider)
+    if _provider["type"] not in PROVIDER_TYPES:
         raise ValueError(f"Unsupported provider: {provider}")
+    key = _response_cache_key(provider, model, messages, tools, bypass_cache)
+    cached = _cached_response(key)
+    if cached is not None:
+        return _areplay(cached) if stream else cached
+    if stream:
+        response = await _achat_ollama(_provider, model, messages, tools, stream)
+    else:
+        with metrics.span("llm.request", model=model):
+            response = await _achat_ollama(_provider, model, messages, tools, stream)
+    if key is None:
+        return response
+    if stream:
+        return _acaching_stream(key, response)
+    _store_response(key, response)
+    return response
+
+
+def _get_response_cache():
+    global _response_cache
+    if _response_cache is None:
+        settings = configs.get_llm_cache_settings()
+        tiers = [LRUCache(settings.get("max_entries", DEFAULT_CACHE_ENTRIES))]
+        if settings.get("path"):
+            tiers.append(
+                SqliteCache(
+                    settings["path"],
+                    settings.get("max_disk_entries", DEFAULT_DISK_CACHE_ENTRIES),
+                )
+            )
+        _response_cache = TieredCache(*tiers)
+    return _response_cache
+
+
+def cache_stats():
+    """
+    Hit/miss counters for each tier of the response cache
+    """
+    return _get_response_cache().stats()
+
+
+def _response_cache_key(provider, model, messages, tools, bypass_cache):
+    if bypass_cache or not configs.get_llm_cache_settings().get("enabled"):
+        return None
+    request = json.dumps(
+        {"provider": provider, "model": model, "messages": messages, "tools": tools},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(request.encode()).hexdigest()
+
+
+def _cached_response(key):
+    if key is None:
+        return None
+    cached = _get_response_cache().get(key)
+    return None if cached is MISSING else json.loads(cached)
+
+
+def _store_response(key, response):
+    if not isinstance(response, _ErrorResponse):
+        _get_response_cache().set(key, json.dumps(response, default=str))
+
+
+def _replay(response):
+    if response["content"]:
+        yield "token", {"content": response["content"]}
+    yield "message", response
+
+
+async def _areplay(response):
+    for event in _replay(response):
+        yield event
+
+
+def _caching_stream(key, events):
+    for event_type, event_data in events:
+        if event_type == "message":
+            _store_response(key, event_data)
+        yield event_type, event_data
+
+
+async def _acaching_stream(key, events):
+    async for event_type, event_data in events:
+        if event_type == "message":
+            _store_response(key, event_data)
+        yield event_type, event_data
+
+
+def get_client(_provider):
+    """
+    Shared ollama.Client for a provider; its HTTP connections are kept alive
+    and reused across calls.
+    """
+    with _clients_lock:
+        client = _clients.get(_provider["name"])
+        if client is None:
+            client = ollama.Client(
+                host=_provider.get("url", DEFAULT_URL), **_client_options(_provider)
+            )
+            _clients[_provider["name"]] = client
+        return client
+
+
+def get_async_client(_provider):
+    """
+    Shared ollama.AsyncClient for a provider on the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        # Async connections can't outlive the loop that opened them
+        for key in [key for key in _async_clients if key[1].is_closed()]:
+            del _async_clients[key]
+        key = (_provider["name"], loop)
+        client = _async_clients.get(key)
+        if client is None:
+            client = ollama.AsyncClient(
+                host=_provider.get("url", DEFAULT_URL), **_client_options(_provider)
+            )
+            _async_clients[key] = client
+        return client
+
+
+def close_clients():
+    """
+    Close every pooled sync client; async clients are dropped with their loop.
+    """
+    with _clients_lock:
+        for client in _clients.values():
+            client._client.close()
+        _clients.clear()
+        _async_clients.clear()
+
+
+def _on_config_change(changes):
+    global _response_cache
+    if "llm_cache" in changes["settings"]:
+        _response_cache = None  # rebuilt from the new settings on next use
+    # Clients of a reconfigured or removed provider (and of its pool backends)
+    # are closed and dropped; async ones close with their loop
+    stale = changes["llm_providers"]["removed"] + changes["llm_providers"]["changed"]
+    if not stale:
+        return
+
+    def is_stale(name):
+        return any(name == p or name.startswith(f"{p}@") for p in stale)
+
+    with _clients_lock:
+        for name in [name for name in _clients if is_stale(name)]:
+            _clients.pop(name)._client.close()
+        for key in [key for key in _async_clients if is_stale(key[0])]:
+            del _async_clients[key]
+
+
+configs.add_listener(_on_config_change)
+
+
+def _client_options(_provider):
+    defaults = httpx.Limits()
+    return {
+        "timeout": _provider.get("timeout"),
+        "limits": httpx.Limits(
+            max_connections=_provider.get("max_connections", defaults.max_connections),
+            max_keepalive_connections=_provider.get(
+                "max_keepalive_connections", defaults.max_keepalive_connections
+            ),
+            keepalive_expiry=_provider.get("keepalive_expiry", defaults.keepalive_expiry),
+        ),
+    }
+
+
+def _chat_ollama(_provider, model, messages, tools=None, stream=False):
+    if configs._config is None:
+        configs.init()
+    if stream:
+        return _stream_ollama(_provider, model, messages, tools)
+    slot = _acquire_slot(_provider, model)
+    backend = error = None
+    try:
+        # Inside the try, so a pool that can't pick a backend still frees the slot
+        backend = _acquire_backend(_provider, model)
+        response = get_client(_backend_provider(_provider, backend)).chat(
+            model=model,
+            messages=messages,
+            tools=tools,
+            keep_alive=_provider.get("keep_alive"),
+        )
+        return _message_dict(response["message"])
+    except Exception as e:
+        error = e
+        return _error_message(e)
+    finally:
+        _release_backend(_provider, backend, model, error)
+        _release_slot(slot)
 
 
-def _chat_ollama(_provider, model, messages, tools=None):
+async def _achat_ollama(_provider, model, messages, tools=None, stream=False):
     if configs._config is None:
         configs.init()
-    base_url = _provider.get("url", "http://localhost:11434")
-    client = ollama.Client(host=base_url)
+    if stream:
+        return _astream_ollama(_provider, model, messages, tools)
+    slot = await _aacquire_slot(_provider, model)
+    backend = error = None
     try:
-        response = client.chat(
+        backend = _acquire_backend(_provider, model)
+        response = await get_async_client(_backend_provider(_provider, backend)).chat(
             model=model,
             messages=messages,
-            tools=tools
+            tools=tools,
+            keep_alive=_provider.get("keep_alive"),
         )
-        message = response["message"]
-        message_dict = {
-            "role": message.role,
-            "content": message.content,
-        }
-        if hasattr(message, "tool_calls") and message.tool_calls:
-            tool_calls = []
-            for tool_call in message.tool_calls:
-                tool_call_dict = {
-                    "function": {
-                        "name": tool_call.function.name,
-                        "arguments": tool_call.function.arguments
-                    },
-                    "id": tool_call.id if hasattr(tool_call, "id") else f"call_{len(tool_calls)}",
-                    "type": "function"
-                }
-                tool_calls.append(tool_call_dict)
-            message_dict["tool_calls"] = tool_calls
-        return message_dict
+        return _message_dict(response["message"])
     except Exception as e:
-        # Log error and return a basic error response
-        print(f"Error calling Ollama API: {e}")
-        return {
-            "role": "assistant",
-            "content": f"I encountered an error: {str(e)}"
-        }
\ No newline at end of file
+        error = e
+        return _error_message(e)
+    finally:
+        _release_backend(_provider, backend, model, error)
+        _release_slot(slot)
+
+
+def _stream_ollama(_provider, model, messages, tools):
+    # Slot and backend are taken on first iteration, so an unread stream holds none
+    content, tool_calls = [], []
+    slot = _acquire_slot(_provider, model)
+    backend = error = None
+    try:
+        backend = _acquire_backend(_provider, model)
+        client = get_client(_backend_provider(_provider, backend))
+        for chunk in client.chat(
+            model=model, messages=messages, tools=tools, stream=True,
+            keep_alive=_provider.get("keep_alive"),
+        ):
+            if chunk.message.content:
+                content.append(chunk.message.content)
+                yield "token", {"content": chunk.message.content}
+            tool_calls.extend(chunk.message.tool_calls or [])
+    except Exception as e:
+        error = e
+        yield "message", _error_message(e)
+        return
+    finally:
+        _release_backend(_provider, backend, model, error)
+        _release_slot(slot)
+    yield "message", _assembled_message(content, tool_calls)
+
+
+async def _astream_ollama(_provider, model, messages, tools):
+    content, tool_calls = [], []
+    slot = await _aacquire_slot(_provider, model)
+    backend = error = None
+    try:
+        backend = _acquire_backend(_provider, model)
+        client = get_async_client(_backend_provider(_provider, backend))
+        async for chunk in await client.chat(
+            model=model, messages=messages, tools=tools, stream=True,
+            keep_alive=_provider.get("keep_alive"),
+        ):
+            if chunk.message.content:
+                content.append(chunk.message.content)
+                yield "token", {"content": chunk.message.content}
+            tool_calls.extend(chunk.message.tool_calls or [])
+    except Exception as e:
+        error = e
+        yield "message", _error_message(e)
+        return
+    finally:
+        _release_backend(_provider, backend, model, error)
+        _release_slot(slot)
+    yield "message", _assembled_message(content, tool_calls)
+
+
+async def aembed(provider, model, input):
+    """
+    Embed input with an ollama model; returns the ollama embed response.
+    """
+    _provider = configs.get_llm_provider(provider)
+    slot = await _aacquire_slot(_provider, model)
+    backend = error = None
+    try:
+        backend = _acquire_backend(_provider, model)
+        return await get_async_client(_backend_provider(_provider, backend)).embed(
+            model=model, input=input
+        )
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        _release_backend(_provider, backend, model, error)
+        _release_slot(slot)
+
+
+async def apreload(provider, model):
+    """
+    Load a model into memory ahead of the first request, on every backend of
+    an ollama-pool provider, and keep it there for the provider's keep_alive.
+    """
+    _provider = configs.get_llm_provider(provider)
+    if _provider["type"] == "ollama-pool":
+        backends = balancer.backends(_provider)
+    else:
+        backends = [None]
+
+    async def preload(backend):
+        # An empty prompt makes ollama load the model without generating
+        await get_async_client(_backend_provider(_provider, backend)).generate(
+            model=model, keep_alive=_provider.get("keep_alive")
+        )
+        if backend is not None:
+            balancer.mark_loaded(backend, model)
+
+    await asyncio.gather(*(preload(backend) for backend in backends))
+
+
+def _acquire_slot(_provider, model):
+    slot = limiter.get_limiter(_provider, model)
+    if slot is not None:
+        try:
+            waited = slot.acquire()
+        except limiter.QueueFullError:
+            metrics.increment("llm.rejected")
+            raise
+        metrics.add_span("llm.queue", waited, model=model)
+    return slot
+
+
+async def _aacquire_slot(_provider, model):
+    slot = limiter.get_limiter(_provider, model)
+    if slot is not None:
+        try:
+            waited = await slot.aacquire()
+        except limiter.QueueFullError:
+            metrics.increment("llm.rejected")
+            raise
+        metrics.add_span("llm.queue", waited, model=model)
+    return slot
+
+
+def _release_slot(slot):
+    if slot is not None:
+        slot.release()
+
+
+def _acquire_backend(_provider, model):
+    if _provider["type"] != "ollama-pool":
+        return None
+    return balancer.acquire(_provider, model)
+
+
+def _backend_provider(_provider, backend):
+    return _provider if backend is None else backend.provider
+
+
+def _release_backend(_provider, backend, model, error):
+    if backend is None:
+        return
+    # A 4xx such as an unknown model says nothing about the backend's health
+    ok = error is None or (
+        isinstance(error, ollama.ResponseError) and 0 <= error.status_code < 500
+    )
+    balancer.release(_provider, backend, model, ok)
+
+
+def _assembled_message(content, tool_calls):
+    # Tool calls may arrive in any chunk, so they're only known once the stream ends
+    return _message_dict(
+        ollama.Message(
+            role="assistant", content="".join(content), tool_calls=tool_calls or None
+        )
+    )
+
+
+def _message_dict(message):
+    message_dict = {
+        "role": message.role,
+        "content": message.content,
+    }
+    if hasattr(message, "tool_calls") and message.tool_calls:
+        tool_calls = []
+        for tool_call in message.tool_calls:
+            tool_call_dict = {
+                "function": {
+                    "name": tool_call.function.name,
+                    "arguments": tool_call.function.arguments
+                },
+                "id": tool_call.id if hasattr(tool_call, "id") else f"call_{len(tool_calls)}",
+                "type": "function"
+            }
+            tool_calls.append(tool_call_dict)
+        message_dict["tool_calls"] = tool_calls
+    return message_dict
+
+
+class _ErrorResponse(dict):
+    """Marks error replies so they are never cached."""
+
+
+def _error_message(e):
+    # Log error and return a basic error response
+    print(f"Error calling Ollama API: {e}")
+    return _ErrorResponse({
+        "role": "assistant",
+        "content": f"I encountered an error: {str(e)}"
+    })
@@ -0,0 +1,226 @@
+"""
+HTTP chat API: many concurrent chats in one process, sharing the MCP session
+pool and the Ollama client pool.
+
+- POST   /chats                 {"message", "agent"?, "provider"?, "model"?, "stream"?,
+                                 "conversation_id"? to resume a stored conversation}
+- POST   /chats/{chat_id}/messages  {"message", "stream"?}
+- GET    /chats/{chat_id}
+- DELETE /chats/{chat_id}
+- GET    /metrics               Prometheus text
+- GET    /health
+
+With "stream": true the reply is a server-sent event stream of token,
+tool_call, tool_progress and tool_result events, ending with a done event carrying the
+chat_id and the updated messages.
+"""
+
+import asyncio
+import contextlib
+import json
+import uuid
+
+import uvicorn
+from sse_starlette.sse import EventSourceResponse
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+from jarbas import configs, limiter, llms, metrics, store, tooledchat, tools
+from jarbas.cache import LRUCache, MISSING
+
+DEFAULT_HOST = "0.0.0.0"
+DEFAULT_PORT = 8000
+DEFAULT_MAX_SESSIONS = 1000
+DEFAULT_SESSION_TTL = 3600
+
+_sessions = None
+
+
+def _get_sessions():
+    global _sessions
+    if _sessions is None:
+        _sessions = LRUCache(
+            configs.get_api_settings().get("max_sessions", DEFAULT_MAX_SESSIONS)
+        )
+    return _sessions
+
+
+def _keep(chat_id, chat):
+    # Re-setting refreshes the idle TTL
+    _get_sessions().set(
+        chat_id,
+        chat,
+        ttl=configs.get_api_settings().get("session_ttl", DEFAULT_SESSION_TTL),
+    )
+
+
+def _error(status_code, message):
+    return JSONResponse(
+        {"type": "error", "code": status_code, "message": message}, status_code
+    )
+
+
+async def _json_body(request):
+    try:
+        body = await request.json()
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(body, dict) or not isinstance(body.get("message"), str):
+        return None
+    return body
+
+
+async def create_chat(request):
+    body = await _json_body(request)
+    if body is None:
+        return _error(400, "Expected a JSON body with a 'message' string")
+    conversation_store = store.get_store()
+    if body.get("conversation_id"):
+        if conversation_store is None:
+            return _error(400, "Conversations are not stored")
+        try:
+            session = tooledchat.ChatSession.resume(body["conversation_id"], conversation_store)
+        except ValueError as e:
+            return _error(404, str(e))
+        run = session.asend
+    else:
+        session = tooledchat.ChatSession(
+            body.get("agent"), body.get("provider"), body.get("model"), conversation_store
+        )
+        run = session.astart
+    if session.selected_agent() is None:
+        return _error(400, f"Agent '{session.agent}' not found")
+    if configs.get_llm_provider(session.provider) is None:
+        return _error(400, f"Provider '{session.provider}' not found")
+    if not session.model:
+        return _error(400, "No model given and no default_model configured")
+    chat_id = uuid.uuid4().hex
+    chat = {"session": session, "lock": asyncio.Lock()}
+    _keep(chat_id, chat)
+    return await _reply(chat_id, chat, body, run)
+
+
+async def send_message(request):
+    chat_id = request.path_params["chat_id"]
+    chat = _get_sessions().get(chat_id)
+    if chat is MISSING:
+        return _error(404, f"Chat not found: {chat_id}")
+    body = await _json_body(request)
+    if body is None:
+        return _error(400, "Expected a JSON body with a 'message' string")
+    _keep(chat_id, chat)
+    return await _reply(chat_id, chat, body, chat["session"].asend)
+
+
+async def get_chat(request):
+    chat_id = request.path_params["chat_id"]
+    chat = _get_sessions().get(chat_id)
+    if chat is MISSING:
+        return _error(404, f"Chat not found: {chat_id}")
+    return JSONResponse(_chat_dict(chat_id, chat["session"]))
+
+
+async def delete_chat(request):
+    chat_id = request.path_params["chat_id"]
+    if _get_sessions().pop(chat_id) is None:
+        return _error(404, f"Chat not found: {chat_id}")
+    return JSONResponse({"chat_id": chat_id, "deleted": True})
+
+
+async def get_metrics(request):
+    return PlainTextResponse(metrics.export_prometheus())
+
+
+async def health(request):
+    return JSONResponse({"status": "ok", "chats": len(_get_sessions())})
+
+
+async def _reply(chat_id, chat, body, run):
+    # One turn at a time per chat; other chats proceed concurrently
+    if chat["lock"].locked():
+        return _error(409, f"Chat {chat_id} is still answering the previous message")
+    if not body.get("stream"):
+        async with chat["lock"]:
+            try:
+                await run(body["message"])
+            except limiter.QueueFullError as e:
+                return _error(503, str(e))
+        return JSONResponse(_chat_dict(chat_id, chat["session"]))
+    await chat["lock"].acquire()
+    events = asyncio.Queue()
+    task = asyncio.create_task(_turn(run, body["message"], events))
+    # Released even if the task is cancelled before it starts
+    task.add_done_callback(lambda _: chat["lock"].release())
+    return EventSourceResponse(_stream(chat_id, chat, task, events))
+
+
+async def _turn(run, text, events):
+    try:
+        await run(text, cb=lambda *event: events.put_nowait(event), stream=True)
+    except Exception as e:
+        events.put_nowait(("error", {"type": "error", "message": str(e)}))
+    finally:
+        events.put_nowait(None)
+
+
+async def _stream(chat_id, chat, task, events):
+    try:
+        while (event := await events.get()) is not None:
+            event_type, event_data = event
+            yield {"event": event_type, "data": json.dumps(event_data, default=str)}
+        done = _chat_dict(chat_id, chat["session"])
+        yield {"event": "done", "data": json.dumps(done, default=str)}
+    finally:
+        # The client went away mid-turn
+        task.cancel()
+
+
+def _chat_dict(chat_id, session):
+    return {
+        "chat_id": chat_id,
+        "conversation_id": session.conversation_id,
+        "agent": session.agent,
+        "provider": session.provider,
+        "model": session.model,
+        "messages": session.messages,
+    }
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # Loads config and, when warmup is enabled, preloads models on this loop
+    await tooledchat.ainit()
+    yield
+    tooledchat.stop_keep_warm()
+    configs.stop_watching()
+    await tools.close_sessions()
+    llms.close_clients()
+
+
+app = Starlette(
+    routes=[
+        Route("/chats", create_chat, methods=["POST"]),
+        Route("/chats/{chat_id}/messages", send_message, methods=["POST"]),
+        Route("/chats/{chat_id}", get_chat, methods=["GET"]),
+        Route("/chats/{chat_id}", delete_chat, methods=["DELETE"]),
+        Route("/metrics", get_metrics, methods=["GET"]),
+        Route("/health", health, methods=["GET"]),
+    ],
+    lifespan=lifespan,
+)
+
+
+def main():
+    """Serve the chat API with uvicorn."""
+    configs.init()
+    settings = configs.get_api_settings()
+    uvicorn.run(
+        app,
+        host=settings.get("host", DEFAULT_HOST),
+        port=settings.get("port", DEFAULT_PORT),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,32 @@
-from jarbas import tooledchat
+from jarbas import metrics, store, tooledchat, tools
 import sys
 import json
 
+_streaming = False
+
+def print_chat_event(event_type, event_data):
+    """Display streamed tokens and tool activity as they happen."""
+    global _streaming
+    if event_type == "token":
+        if not _streaming:
+            print(f"\n🤖 Assistant: ", end="")
+            _streaming = True
+        print(event_data["content"], end="", flush=True)
+        return
+    if _streaming:
+        print()
+        _streaming = False
+    print_tool_activity(event_type, event_data)
+
+def finish_streamed_response(message):
+    """Close the streamed line, or fall back to printing the whole response."""
+    global _streaming
+    if _streaming:
+        print()
+        _streaming = False
+    else:
+        display_assistant_response(message)
+
 def print_tool_activity(event_type, event_data):
     """Display tool call and result information during chat."""
     if event_type == "tool_call":
@@ -10,6 +35,12 @@ def print_tool_activity(event_type, event_data):
         print(f"\n🔧 Calling tool: {tool}")
         print(f"   Arguments: {json.dumps(args, indent=2)[:100]}{'...' if len(json.dumps(args)) > 100 else ''}")
         print("   Working...", end="", flush=True)
+    elif event_type == "tool_progress":
+        total = event_data.get("total")
+        if total:
+            print(f" {event_data['progress'] / total:.0%}", end="", flush=True)
+        else:
+            print(".", end="", flush=True)
     elif event_type == "tool_result":
         print(" Done ✓")
         result_preview = str(event_data["result"])
@@ -17,6 +48,8 @@ def print_tool_activity(event_type, event_data):
         if len(result_preview) > 200:
             result_preview = result_preview[:200] + "..."
         print(f"   Result preview: {result_preview}")
+        if event_data.get("handle"):
+            print(f"   Full result kept out of the conversation as {event_data['handle']}")
 
 def display_assistant_response(message):
     """Display only the assistant's response."""
@@ -32,6 +65,50 @@ def display_assistant_response(message):
     else:
         print("No response")
 
+def display_discovery_report():
+    """Display how long each MCP server took to list its tools."""
+    for server, report in tools.discovery_report.items():
+        if report["status"] == "ok":
+            print(f"  {server}: {report['tools']} tools in {report['seconds']:.2f}s")
+        elif report["status"] == "cached":
+            print(f"  {server}: {report['tools']} tools from cache")
+        else:
+            print(f"  {server}: {report['status']} after {report['seconds']:.2f}s ({report['error']})")
+
+def display_stats(prometheus=False):
+    """Display the timing breakdown of the last turn and totals per phase."""
+    if prometheus:
+        print(metrics.export_prometheus(), end="")
+        return
+    stats = metrics.export_json()
+    if stats["last_turn"] is None:
+        print("No chat turns yet.")
+        return
+    print("Last turn:")
+    _print_span(stats["last_turn"], 1)
+    print("All turns:")
+    for name, histogram in sorted(stats["histograms"].items()):
+        print(f"  {name:<24}{histogram['count']:>6} x {histogram['mean_ms']:>9.1f}ms avg")
+
+def _print_span(span, depth):
+    attributes = ", ".join(f"{k}={v}" for k, v in span["attributes"].items())
+    print(f"{'  ' * depth}{span['name']}: {span['ms']:.1f}ms{f' ({attributes})' if attributes else ''}")
+    for child in span["children"]:
+        _print_span(child, depth + 1)
+
+def display_history():
+    """Display the most recent stored conversations."""
+    conversation_store = store.get_store()
+    if conversation_store is None:
+        print("Conversations are not stored (no conversation_store in config.yaml).")
+        return
+    conversations = conversation_store.list()
+    if not conversations:
+        print("No stored conversations yet.")
+    for conversation in conversations:
+        print(f"  {conversation['id']}  [{conversation['agent']}] "
+              f"{conversation['title'] or '(empty)'} ({conversation['message_count']} messages)")
+
 def display_help():
     """Display help information."""
     print("\n--- Jarbas CLI Help ---")
@@ -41,6 +118,10 @@ def display_help():
     print("  /exit        - Same as /quit")
     print("  /agent NAME  - Switch to a different agent (e.g., /agent helpful)")
     print("  /reset       - Reset the conversation history")
+    print("  /history     - List stored conversations")
+    print("  /resume ID   - Continue a stored conversation")
+    print("  /servers     - Show MCP servers discovered so far")
+    print("  /stats [prom] - Show where the time went (prom: Prometheus format)")
     print("\nUsage Tips:")
     print("  - The system maintains conversation context across messages")
     print("  - When tools are used, you'll see real-time updates on tool execution")
@@ -64,6 +145,9 @@ def handle_command(user_input, conversation):
         return True, False, conversation
         
     if user_input.lower() == "/quit" or user_input.lower() == "/exit":
+        conversation_id = tooledchat.default_session().conversation_id
+        if conversation_id:
+            print(f"Conversation saved; /resume {conversation_id} to continue it.")
         print("Goodbye! 👋")
         return True, True, conversation
             
@@ -82,6 +166,30 @@ def handle_command(user_input, conversation):
             print(f"Error: {e}")
             return True, False, conversation
             
+    if user_input.lower() == "/servers":
+        if not tools.discovery_report:
+            print("No MCP servers discovered yet.")
+        display_discovery_report()
+        return True, False, conversation
+            
+    if user_input.lower() in ("/stats", "/stats prom"):
+        display_stats(prometheus=user_input.lower().endswith("prom"))
+        return True, False, conversation
+            
+    if user_input.lower() == "/history":
+        display_history()
+        return True, False, conversation
+            
+    if user_input.lower().startswith("/resume "):
+        try:
+            messages = tooledchat.resume(user_input[8:].strip())
+            print(f"Resumed conversation with agent: {tooledchat.agent}")
+            display_assistant_response(messages[-1])
+            return True, False, messages
+        except ValueError as e:
+            print(f"Error: {e}")
+            return True, False, conversation
+            
     if user_input.lower() == "/reset":
         print("Conversation reset.")
         return True, False, []
@@ -116,12 +224,12 @@ def main():
                 continue
             
             if not conversation:
-                messages = tooledchat.start_chat(tooledchat.agent, user_input, cb=print_tool_activity)
+                messages = tooledchat.start_chat(tooledchat.agent, user_input, cb=print_chat_event, stream=True)
             else:
                 conversation.append({"role": "user", "content": user_input})
-                messages = tooledchat.chat(conversation, cb=print_tool_activity)
+                messages = tooledchat.chat(conversation, cb=print_chat_event, stream=True)
             conversation = messages
-            display_assistant_response(messages[-1])
+            finish_streamed_response(messages[-1])
                 
         except KeyboardInterrupt:
             print("\nChat interrupted. Type /quit to exit or continue chatting.")
@@ -1,9 +1,9 @@
 import streamlit as st
-from jarbas import tooledchat
+from jarbas import metrics, store, tooledchat
 import json
 import traceback
 
-def display_tool_activity(tool_name, arguments, result=None):
+def display_tool_activity(tool_name, arguments, result=None, handle=None):
     """Display tool call and result information in the UI."""
     with st.chat_message("assistant", avatar="🔧"):
         st.write(f"Calling tool: **{tool_name}**")
@@ -12,50 +12,92 @@ def display_tool_activity(tool_name, arguments, result=None):
         
         if result is not None:
             st.write("✅ Tool execution complete")
+            if handle:
+                st.caption(f"Large result: the model sees a truncated copy (handle `{handle}`)")
             with st.expander("Result preview"):
                 if isinstance(result, dict) or isinstance(result, list):
                     st.json(result)
                 else:
                     st.write(str(result)[:1000] + "..." if len(str(result)) > 1000 else str(result))
+        else:
+            # Filled in by tool_progress events while the tool runs
+            return st.empty()
+
+def display_tool_progress(placeholder, progress, total):
+    """Show how far along a running tool is."""
+    if total:
+        fraction = min(max(progress / total, 0.0), 1.0)
+        placeholder.progress(fraction, text=f"{progress:g} / {total:g}")
+    else:
+        placeholder.caption(f"Working... ({progress:g})")
 
 def print_tool_activity(event_type, event_data):
     """Callback for tool activity that works with Streamlit."""
+    if event_type == "token":
+        # Render the response incrementally in a single chat bubble
+        if st.session_state.stream_placeholder is None:
+            st.session_state.stream_placeholder = st.chat_message("assistant", avatar="🤖").empty()
+            st.session_state.streamed_text = ""
+        st.session_state.streamed_text += event_data["content"]
+        st.session_state.stream_placeholder.markdown(st.session_state.streamed_text)
+        return
+    # Any text after a tool call belongs to a new response bubble
+    st.session_state.stream_placeholder = None
+
     if event_type == "tool_call":
         tool = event_data["tool"]
         args = event_data["arguments"]
-        # Store tool call info in session state to display it
-        st.session_state.current_tool = {
+        # Store tool call info by call id; concurrent calls may finish in any order
+        st.session_state.current_tools[event_data.get("id")] = {
             "name": tool,
-            "args": args
+            "args": args,
+            # Display the tool call immediately
+            "progress": display_tool_activity(tool, args)
         }
-        # Display the tool call immediately
-        display_tool_activity(tool, args)
+
+    elif event_type == "tool_progress":
+        current_tool = st.session_state.current_tools.get(event_data.get("id"))
+        if current_tool:
+            display_tool_progress(current_tool["progress"], event_data["progress"], event_data.get("total"))
         
     elif event_type == "tool_result":
         # Complete the tool call display with the result
-        if "current_tool" in st.session_state:
+        current_tool = st.session_state.current_tools.pop(event_data.get("id"), None)
+        if current_tool:
+            current_tool["progress"].empty()
             display_tool_activity(
-                st.session_state.current_tool["name"], 
-                st.session_state.current_tool["args"],
-                event_data["result"]
+                current_tool["name"], 
+                current_tool["args"],
+                event_data["result"],
+                event_data.get("handle")
             )
-            # Clear the current tool
-            st.session_state.current_tool = None
 
 def handle_command(command):
     """Handle slash commands."""
     if command.lower() == "/reset":
-        st.session_state.messages = []
-        st.session_state.conversation = []
+        st.session_state.chat_session.reset()
         st.success("Conversation reset.")
         return True
+
+    if command.lower().startswith("/resume "):
+        conversation_store = store.get_store()
+        if conversation_store is None:
+            st.error("Conversations are not stored (no conversation_store in config.yaml).")
+            return True
+        try:
+            st.session_state.chat_session = tooledchat.ChatSession.resume(
+                command[8:].strip(), conversation_store
+            )
+            return True
+        except ValueError as e:
+            st.error(f"Error: {e}")
+            return True
     
     if command.lower().startswith("/agent "):
         agent_name = command[7:].strip()
         try:
-            tooledchat.set_agent(agent_name)
-            st.session_state.messages = []
-            st.session_state.conversation = []
+            st.session_state.chat_session.set_agent(agent_name)
+            st.session_state.chat_session.reset()
             st.success(f"Switched to agent: {agent_name}")
             return True
         except ValueError as e:
@@ -68,6 +110,7 @@ def handle_command(command):
         - **/help** - Show this help message
         - **/reset** - Reset the conversation history
         - **/agent NAME** - Switch to a different agent
+        - **/resume ID** - Continue a stored conversation
         
         ## Usage Tips:
         - The system maintains conversation context across messages
@@ -80,18 +123,25 @@ def handle_command(command):
 
 def init_session_state():
     """Initialize session state variables."""
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
+    if "pending_prompt" not in st.session_state:
+        st.session_state.pending_prompt = None
     
-    if "conversation" not in st.session_state:
-        st.session_state.conversation = []
+    if "chat_session" not in st.session_state:
+        # Each browser session chats with its own agent, model and history
+        st.session_state.chat_session = tooledchat.ChatSession(
+            conversation_store=store.get_store()
+        )
         
-    if "current_tool" not in st.session_state:
-        st.session_state.current_tool = None
+    if "current_tools" not in st.session_state:
+        st.session_state.current_tools = {}
         
     if "processing" not in st.session_state:
         st.session_state.processing = False
 
+    if "stream_placeholder" not in st.session_state:
+        st.session_state.stream_placeholder = None
+        st.session_state.streamed_text = ""
+
 def main():
     """Main Streamlit app."""
     st.set_page_config(
@@ -110,7 +160,8 @@ def main():
     
     # App header
     st.title("Jarbas Web 🤖")
-    st.caption(f"Using agent: **{tooledchat.agent}**")
+    chat_session = st.session_state.chat_session
+    st.caption(f"Using agent: **{chat_session.agent}**")
     
     # Display command help in sidebar
     with st.sidebar:
@@ -118,10 +169,13 @@ def main():
         st.markdown("- **/help** - Show help message")
         st.markdown("- **/reset** - Reset conversation")
         st.markdown("- **/agent NAME** - Switch agent")
+        st.markdown("- **/resume ID** - Continue a stored conversation")
+        if chat_session.conversation_id:
+            st.caption(f"Conversation `{chat_session.conversation_id}`")
         
         # Display available agents
         try:
-            agents = tooledchat._get_selected_agent()
+            agents = chat_session.selected_agent()
             if agents:
                 st.markdown("## Current Agent")
                 st.json({
@@ -130,9 +184,21 @@ def main():
                 }, expanded=False)
         except:
             pass
+
+        stats = metrics.export_json()
+        if chat_session.last_turn:
+            last_turn = chat_session.last_turn.to_dict()
+            st.markdown("## Performance")
+            st.caption(f"Last turn: {last_turn['ms']:.0f}ms")
+            st.json(last_turn, expanded=False)
+            with st.expander("All turns"):
+                st.table([
+                    {"phase": name, "count": h["count"], "avg ms": round(h["mean_ms"], 1)}
+                    for name, h in sorted(stats["histograms"].items())
+                ])
     
-    # Display chat messages
-    for message in st.session_state.messages:
+    # Display chat messages; the session holds only a recent window of them
+    for message in chat_session.messages:
         if message["role"] == "user":
             with st.chat_message("user", avatar="👤"):
                 st.write(message["content"])
@@ -140,6 +206,9 @@ def main():
             with st.chat_message("assistant", avatar="🤖"):
                 if "content" in message and message["content"]:
                     st.write(message["content"])
+    if st.session_state.pending_prompt is not None:
+        with st.chat_message("user", avatar="👤"):
+            st.write(st.session_state.pending_prompt)
     
     # Display processing indicator if needed
     if st.session_state.processing:
@@ -149,13 +218,6 @@ def main():
     
     # Chat input
     if prompt := st.chat_input("Type a message...", disabled=st.session_state.processing):
-        # Add user message to chat history
-        st.session_state.messages.append({"role": "user", "content": prompt})
-        
-        # Display user message
-        with st.chat_message("user", avatar="👤"):
-            st.write(prompt)
-        
         # Check if it's a command
         if prompt.startswith("/"):
             if handle_command(prompt):
@@ -163,30 +225,27 @@ def main():
                 st.rerun()
         
         # Set processing state
+        st.session_state.pending_prompt = prompt
         st.session_state.processing = True
         st.rerun()
 
     # Process the message if in processing state
-    if st.session_state.processing and st.session_state.messages and st.session_state.messages[-1]["role"] == "user":
+    if st.session_state.processing and st.session_state.pending_prompt is not None:
         try:
-            prompt = st.session_state.messages[-1]["content"]
+            prompt = st.session_state.pending_prompt
             
             # Process the message with Jarbas
-            if not st.session_state.conversation:
-                messages = tooledchat.start_chat(tooledchat.agent, prompt, cb=print_tool_activity)
-            else:
-                st.session_state.conversation.append({"role": "user", "content": prompt})
-                messages = tooledchat.chat(st.session_state.conversation, cb=print_tool_activity)
-            
-            st.session_state.conversation = messages
+            st.session_state.stream_placeholder = None
+            messages = chat_session.send(prompt, cb=print_tool_activity, stream=True)
             
-            # Display the assistant's response
+            # Display the assistant's response unless it was already streamed
             assistant_message = messages[-1]
             if assistant_message["role"] == "assistant":
-                st.session_state.messages.append(assistant_message)
-                with st.chat_message("assistant", avatar="🤖"):
-                    if "content" in assistant_message and assistant_message["content"]:
-                        st.write(assistant_message["content"])
+                if st.session_state.stream_placeholder is None:
+                    with st.chat_message("assistant", avatar="🤖"):
+                        if "content" in assistant_message and assistant_message["content"]:
+                            st.write(assistant_message["content"])
+                st.session_state.stream_placeholder = None
             
         except Exception as e:
             st.error(f"Error: {str(e)}")
@@ -194,6 +253,7 @@ def main():
                 st.code(traceback.format_exc())
         finally:
             # Clear processing state
+            st.session_state.pending_prompt = None
             st.session_state.processing = False
             st.rerun()
 
@@ -0,0 +1,145 @@
+import contextlib
+import contextvars
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+last_turn = None
+
+_current_span = contextvars.ContextVar("jarbas_current_span", default=None)
+_histograms = {}
+_counters = {}
+_lock = threading.Lock()
+
+
+class Span:
+    """A timed phase of a chat turn; nested phases are its children."""
+
+    def __init__(self, name, attributes=None):
+        self.name = name
+        self.attributes = attributes or {}
+        self.duration = None
+        self.children = []
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "ms": None if self.duration is None else self.duration * 1000,
+            "attributes": self.attributes,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+
+@contextlib.contextmanager
+def span(name, **attributes):
+    """
+    Time a block as a child of the enclosing span and record it in the
+    histogram for name.
+    example:
+    - with metrics.span("tools.call", tool=name): ...
+    """
+    current = Span(name, attributes)
+    parent = _current_span.get()
+    if parent is not None:
+        parent.children.append(current)
+    token = _current_span.set(current)
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        current.duration = time.perf_counter() - start
+        _current_span.reset(token)
+        observe(name, current.duration)
+
+
+def add_span(name, duration, **attributes):
+    """
+    Record a phase that was timed elsewhere (e.g. in a background task) under
+    the current span.
+    """
+    completed = Span(name, attributes)
+    completed.duration = duration
+    parent = _current_span.get()
+    if parent is not None:
+        parent.children.append(completed)
+    observe(name, duration)
+
+
+def observe(name, seconds):
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = {"count": 0, "sum": 0.0, "buckets": [0] * len(DEFAULT_BUCKETS)}
+            _histograms[name] = histogram
+        histogram["count"] += 1
+        histogram["sum"] += seconds
+        # buckets are cumulative, as in Prometheus: a sample counts in every
+        # bucket whose upper bound it fits under
+        for i, bound in enumerate(DEFAULT_BUCKETS):
+            if seconds <= bound:
+                histogram["buckets"][i] += 1
+
+
+def increment(name, amount=1):
+    """
+    Count an event that has no duration, e.g. a rejected request
+    """
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def reset():
+    global last_turn
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+    last_turn = None
+
+
+def export_json():
+    """
+    Histograms per span name (cumulative bucket counts keyed by upper bound),
+    event counters and the span tree of the last chat turn
+    """
+    with _lock:
+        histograms = {
+            name: {
+                "count": h["count"],
+                "sum_seconds": h["sum"],
+                "mean_ms": h["sum"] / h["count"] * 1000 if h["count"] else 0.0,
+                "buckets": dict(zip(map(str, DEFAULT_BUCKETS), h["buckets"])),
+            }
+            for name, h in _histograms.items()
+        }
+        counters = dict(_counters)
+    return {
+        "histograms": histograms,
+        "counters": counters,
+        "last_turn": last_turn.to_dict() if last_turn else None,
+    }
+
+
+def export_prometheus():
+    """
+    Histograms in the Prometheus text exposition format
+    """
+    metric = "jarbas_span_duration_seconds"
+    lines = [
+        f"# HELP {metric} Time spent in each phase of a chat turn.",
+        f"# TYPE {metric} histogram",
+    ]
+    with _lock:
+        for name, h in sorted(_histograms.items()):
+            for bound, count in zip(DEFAULT_BUCKETS, h["buckets"]):
+                lines.append(f'{metric}_bucket{{span="{name}",le="{bound}"}} {count}')
+            lines.append(f'{metric}_bucket{{span="{name}",le="+Inf"}} {h["count"]}')
+            lines.append(f'{metric}_sum{{span="{name}"}} {h["sum"]}')
+            lines.append(f'{metric}_count{{span="{name}"}} {h["count"]}')
+        if _counters:
+            lines.append("# HELP jarbas_events_total Events counted by name.")
+            lines.append("# TYPE jarbas_events_total counter")
+            for name, value in sorted(_counters.items()):
+                lines.append(f'jarbas_events_total{{event="{name}"}} {value}')
+    return "\n".join(lines) + "\n"
+
@@ -0,0 +1,208 @@
+import fnmatch
+import json
+import os
+import time
+import uuid
+from jarbas import configs
+from jarbas.cache import LRUCache, MISSING
+
+DEFAULT_MAX_CHARS = 8000
+DEFAULT_MAX_STORED = 256
+DEFAULT_STORE_TTL = 86400
+HANDLE_PREFIX = "res_"
+READ_RESULT_TOOL_NAME = "jarbas.read_result"
+
+READ_RESULT_TOOL = {
+    "type": "function",
+    "function": {
+        "name": READ_RESULT_TOOL_NAME,
+        "description": (
+            "Read more of a tool result that was truncated. "
+            "Pass the handle from the truncated result and the offset to continue from."
+        ),
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "handle": {"type": "string"},
+                "offset": {"type": "integer"},
+                "limit": {"type": "integer"},
+            },
+            "required": ["handle"],
+        },
+    },
+}
+
+_stored = None
+
+
+def _get_store():
+    global _stored
+    if _stored is None:
+        _stored = LRUCache(
+            configs.get_tool_results_settings().get("max_stored", DEFAULT_MAX_STORED)
+        )
+    return _stored
+
+
+def _on_config_change(changes):
+    # Stored payloads are still referenced by conversations, so the store is
+    # resized rather than rebuilt; it trims on the next store
+    if "tool_results" in changes["settings"] and _stored is not None:
+        _stored.max_entries = configs.get_tool_results_settings().get(
+            "max_stored", DEFAULT_MAX_STORED
+        )
+
+
+configs.add_listener(_on_config_change)
+
+
+def _max_chars(tool_name):
+    settings = configs.get_tool_results_settings()
+    rule = next(
+        (
+            r
+            for r in settings.get("limits", [])
+            if tool_name is not None and fnmatch.fnmatchcase(tool_name, r["pattern"])
+        ),
+        None,
+    )
+    if rule is not None:
+        return rule["max_chars"]
+    return settings.get("max_chars", DEFAULT_MAX_CHARS)
+
+
+def store(text, tool_name=None):
+    """
+    Keep a full tool payload out of the conversation and return its handle
+    """
+    handle = HANDLE_PREFIX + uuid.uuid4().hex[:16]
+    # The tool name sets the page size for reads; payloads reloaded from disk
+    # fall back to the global max_chars
+    _get_store().set(handle, {"text": text, "tool": tool_name})
+    store_dir = configs.get_tool_results_settings().get("store_dir")
+    if store_dir:
+        os.makedirs(store_dir, exist_ok=True)
+        with open(os.path.join(store_dir, f"{handle}.json"), "w") as file:
+            file.write(text)
+        _prune(store_dir)
+    return handle
+
+
+def _prune(store_dir):
+    # Files outlive the in-memory LRU (and restarts), so the directory has its
+    # own cap: the newest max_stored files, none older than store_ttl seconds
+    settings = configs.get_tool_results_settings()
+    max_stored = settings.get("max_stored", DEFAULT_MAX_STORED)
+    ttl = settings.get("store_ttl", DEFAULT_STORE_TTL)
+    files = []
+    for name in os.listdir(store_dir):
+        if name.startswith(HANDLE_PREFIX) and name.endswith(".json"):
+            path = os.path.join(store_dir, name)
+            try:
+                files.append((os.path.getmtime(path), path))
+            except OSError:
+                pass  # removed by another process
+    files.sort(reverse=True)
+    now = time.time()
+    for i, (mtime, path) in enumerate(files):
+        if i >= max_stored or now - mtime > ttl:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def load(handle):
+    """
+    Full payload for a handle, or None if it is no longer stored
+    """
+    entry = _get_store().get(handle)
+    if entry is not MISSING:
+        return entry["text"]
+    store_dir = configs.get_tool_results_settings().get("store_dir")
+    if not store_dir or not handle.startswith(HANDLE_PREFIX):
+        return None
+    path = os.path.join(store_dir, f"{os.path.basename(handle)}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as file:
+        return file.read()
+
+
+def compact(tool_name, result):
+    """
+    Return what the model should see for a tool result and the handle of the
+    stored full payload (None when the result fits within its limit).
+    """
+    text = result if isinstance(result, str) else json.dumps(result, default=str)
+    max_chars = _max_chars(tool_name)
+    if len(text) <= max_chars:
+        return result, None
+    handle = store(text, tool_name)
+    return _page(handle, text, 0, max_chars), handle
+
+
+def read(handle, offset=0, limit=None):
+    """
+    A page of a stored payload, in the same shape compact returns.
+    The arguments come from the model, so bad ones get an error result it
+    can read rather than an exception.
+    """
+    if not isinstance(handle, str) or not handle:
+        return {
+            "type": "error",
+            "message": "handle must be the string handle of a truncated result",
+        }
+    entry = _get_store().get(handle)
+    max_chars = _max_chars(entry["tool"] if entry is not MISSING else None)
+    offset = _non_negative_int(offset, 0)
+    limit = _non_negative_int(limit, max_chars)
+    if offset is None or limit is None:
+        return {"type": "error", "message": "offset and limit must be non-negative integers"}
+    text = load(handle)
+    if text is None:
+        return {"type": "error", "message": f"Unknown result handle: {handle}"}
+    # Never more per page than compact would have let through
+    return _page(handle, text, offset, min(limit or max_chars, max_chars))
+
+
+def _non_negative_int(value, default):
+    # None when value can't be read as a count
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    elif isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    if not isinstance(value, int) or value < 0:
+        return None
+    return value
+
+
+def is_truncated_page(result):
+    """
+    Whether a tool result is a page of a stored payload with more to read
+    """
+    return isinstance(result, dict) and bool(result.get("truncated")) and isinstance(
+        result.get("handle"), str
+    )
+
+
+def _page(handle, text, offset, limit):
+    end = offset + limit
+    page = {
+        "truncated": end < len(text),
+        "handle": handle,
+        "total_chars": len(text),
+        "offset": offset,
+        "content": text[offset:end],
+    }
+    if page["truncated"]:
+        page["next_offset"] = end
+        page["note"] = (
+            f"Result truncated. Call {READ_RESULT_TOOL_NAME} with this handle "
+            f"and offset {end} to read more."
+        )
+    return page
@@ -0,0 +1,200 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from jarbas import configs
+
+DEFAULT_PATH = ".jarbas/conversations.sqlite"
+DEFAULT_WINDOW = 50
+TITLE_CHARS = 80
+
+_store = None
+_store_settings = None
+
+
+class ConversationStore(ABC):
+    """
+    Where conversations live beyond the recent window kept in memory.
+    Messages are only ever appended; implementations must be thread safe.
+    """
+
+    @abstractmethod
+    def create(self, agent, provider, model):
+        """Start a conversation and return its id."""
+
+    @abstractmethod
+    def append(self, conversation_id, messages):
+        """Add messages to the end of a conversation."""
+
+    @abstractmethod
+    def load(self, conversation_id, limit=None):
+        """
+        Messages of a conversation in order, or None if it doesn't exist.
+        With limit, only the leading system messages and the last limit
+        messages.
+        """
+
+    @abstractmethod
+    def get(self, conversation_id):
+        """Agent, provider, model and title of a conversation, or None."""
+
+    @abstractmethod
+    def list(self, limit=20):
+        """The most recently updated conversations, newest first."""
+
+    @abstractmethod
+    def delete(self, conversation_id):
+        """Remove a conversation and its messages."""
+
+
+class SqliteStore(ConversationStore):
+    """Conversations in a SQLite file, one row per message."""
+
+    def __init__(self, path=DEFAULT_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS conversations ("
+            " id TEXT PRIMARY KEY, agent TEXT, provider TEXT, model TEXT,"
+            " title TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL,"
+            " message_count INTEGER NOT NULL DEFAULT 0);"
+            "CREATE TABLE IF NOT EXISTS messages ("
+            " conversation_id TEXT NOT NULL, seq INTEGER NOT NULL,"
+            " role TEXT NOT NULL, message TEXT NOT NULL,"
+            " PRIMARY KEY (conversation_id, seq));"
+        )
+        self._db.commit()
+
+    def create(self, agent, provider, model):
+        conversation_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO conversations (id, agent, provider, model, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (conversation_id, agent, provider, model, now, now),
+            )
+            self._db.commit()
+        return conversation_id
+
+    def append(self, conversation_id, messages):
+        if not messages:
+            return
+        with self._lock:
+            row = self._db.execute(
+                "SELECT message_count, title FROM conversations WHERE id = ?",
+                (conversation_id,),
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Conversation not found: {conversation_id}")
+            count, title = row
+            if title is None:
+                title = next(
+                    (
+                        (m.get("content") or "")[:TITLE_CHARS]
+                        for m in messages
+                        if m["role"] == "user"
+                    ),
+                    None,
+                )
+            self._db.executemany(
+                "INSERT INTO messages (conversation_id, seq, role, message) VALUES (?, ?, ?, ?)",
+                [
+                    (conversation_id, count + i, m["role"], json.dumps(m, default=str))
+                    for i, m in enumerate(messages)
+                ],
+            )
+            self._db.execute(
+                "UPDATE conversations SET message_count = ?, title = ?, updated_at = ? "
+                "WHERE id = ?",
+                (count + len(messages), title, time.time(), conversation_id),
+            )
+            self._db.commit()
+
+    def load(self, conversation_id, limit=None):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT message_count FROM conversations WHERE id = ?", (conversation_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            head = first = 0
+            if limit is not None:
+                (head,) = self._db.execute(
+                    "SELECT COUNT(*) FROM messages WHERE conversation_id = ? AND seq < "
+                    "(SELECT COALESCE(MIN(seq), ?) FROM messages "
+                    " WHERE conversation_id = ? AND role != 'system')",
+                    (conversation_id, row[0], conversation_id),
+                ).fetchone()
+                first = max(head, row[0] - limit)
+            rows = self._db.execute(
+                "SELECT message FROM messages WHERE conversation_id = ? "
+                "AND (seq < ? OR seq >= ?) ORDER BY seq",
+                (conversation_id, head, first),
+            ).fetchall()
+        return [json.loads(message) for (message,) in rows]
+
+    def get(self, conversation_id):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, agent, provider, model, title, created_at, updated_at, "
+                "message_count FROM conversations WHERE id = ?",
+                (conversation_id,),
+            ).fetchone()
+        return None if row is None else self._conversation_dict(row)
+
+    def list(self, limit=20):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, agent, provider, model, title, created_at, updated_at, "
+                "message_count FROM conversations ORDER BY updated_at DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [self._conversation_dict(row) for row in rows]
+
+    def delete(self, conversation_id):
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM messages WHERE conversation_id = ?", (conversation_id,)
+            )
+            self._db.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,))
+            self._db.commit()
+
+    @staticmethod
+    def _conversation_dict(row):
+        keys = ("id", "agent", "provider", "model", "title", "created_at",
+                "updated_at", "message_count")
+        return dict(zip(keys, row))
+
+
+STORE_TYPES = {"sqlite": lambda settings: SqliteStore(settings.get("path", DEFAULT_PATH))}
+
+
+def get_store():
+    """
+    The configured conversation store, or None when conversation_store is not
+    configured and conversations only live in memory
+    """
+    global _store, _store_settings
+    settings = configs.get_conversation_store_settings()
+    if not settings:
+        return None
+    if _store is None or _store_settings is not settings:
+        store_type = settings.get("type", "sqlite")
+        if store_type not in STORE_TYPES:
+            raise ValueError(f"Unsupported conversation store: {store_type}")
+        _store = STORE_TYPES[store_type](settings)
+        _store_settings = settings
+    return _store
+
+
+def get_window():
+    """
+    How many recent messages a session keeps in memory when it has a store
+    """
+    return configs.get_conversation_store_settings().get("window", DEFAULT_WINDOW)
@@ -1,35 +1,331 @@
-from jarbas import configs, tools, llms
+from jarbas import configs, context, tools, llms, metrics, results, store, toolselect
 import asyncio
 import json
+import queue
+import threading
+import time
 
-provider = None
-model = None
-agent = None
+_default_session = None
+
+_loop = None
+_loop_lock = threading.Lock()
+
+def _get_loop():
+    # One long-lived loop shared by every sync call keeps MCP sessions warm
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="jarbas-loop", daemon=True).start()
+    return _loop
+
+def _run(make_coro, cb=None):
+    """
+    Run a coroutine on the shared loop and block until it finishes.
+    make_coro receives the callback to pass along; events are relayed back
+    so cb always runs on the calling thread.
+    """
+    loop = _get_loop()
+    events = queue.Queue()
+    relay = (lambda event_type, event_data: events.put((event_type, event_data))) if cb else None
+    future = asyncio.run_coroutine_threadsafe(make_coro(relay), loop)
+    future.add_done_callback(lambda _: events.put(None))
+    try:
+        while (event := events.get()) is not None:
+            cb(*event)
+    except BaseException:
+        future.cancel()
+        raise
+    return future.result()
+
+def _split_model(name):
+    if name and "/" in name:
+        return name.split("/", 1)
+    return None, None
+
+def _default_provider_and_model(agent_name=None):
+    # An agent may pin its own "provider/model"; otherwise default_model applies
+    selected_agent = configs.get_agent(agent_name)
+    return _split_model((selected_agent or {}).get("model") or configs.get_default_model())
+
+def _switch_resets_model(old_agent, new_agent):
+    # A model picked by the user survives an agent switch, unless the old or
+    # the new agent pins its own
+    return any((configs.get_agent(a) or {}).get("model") for a in (old_agent, new_agent))
+
+class ChatSession:
+    """
+    One conversation: its agent, provider/model and message history.
+    Sessions share the process-wide MCP and LLM client pools but no chat
+    state, so many can run concurrently.
+    With a conversation store, every new message is appended to it and only
+    the most recent window of messages stays in memory.
+    example:
+    - session = ChatSession("helpful", conversation_store=store.get_store())
+    - session.send("list 10 slack users")
+    - session.send("now only the admins")
+    - ChatSession.resume(session.conversation_id, store.get_store())
+    """
+
+    def __init__(self, agent=None, provider=None, model=None, conversation_store=None):
+        if configs._config is None:
+            configs.init()
+        self.agent = agent or configs.get_default_agent()
+        default_provider, default_model = _default_provider_and_model(self.agent)
+        self.provider = provider or default_provider
+        self.model = model or default_model
+        self.conversation_store = conversation_store
+        self.conversation_id = None
+        self.messages = []
+        self.last_turn = None
+        # How many of self.messages are stored, and the last of them
+        self._stored = (0, None)
+
+    @classmethod
+    def resume(cls, conversation_id, conversation_store):
+        """
+        Pick up a stored conversation where it left off
+        """
+        conversation = conversation_store.get(conversation_id)
+        if conversation is None:
+            raise ValueError(f"Conversation not found: {conversation_id}")
+        session = cls(
+            conversation["agent"],
+            conversation["provider"],
+            conversation["model"],
+            conversation_store,
+        )
+        session.conversation_id = conversation_id
+        session.messages = _window(
+            conversation_store.load(conversation_id, limit=store.get_window())
+        )
+        session._stored = (len(session.messages), session.messages[-1] if session.messages else None)
+        return session
+
+    def selected_agent(self):
+        return configs.get_agent(self.agent)
+
+    def set_agent(self, agent_name):
+        if configs.get_agent(agent_name) is None:
+            raise ValueError(f"Agent '{agent_name}' not found")
+        previous, self.agent = self.agent, agent_name
+        if _switch_resets_model(previous, agent_name):
+            self.provider, self.model = _default_provider_and_model(agent_name)
+
+    def set_provider_and_model(self, provider, model):
+        self.provider = provider
+        self.model = model
+
+    def reset(self):
+        self.messages = []
+        self.conversation_id = None
+        self._stored = (0, None)
+
+    async def agent_tools(self):
+        """
+        The tool definitions this session's agent may use, or None
+        """
+        selected_agent = self.selected_agent()
+        if not (selected_agent and selected_agent.get("enable_tools") and "tools" in selected_agent):
+            return None
+        with metrics.span("tools.discover"):
+            await tools.ensure_tools(*selected_agent["tools"])
+            return tools.get_tools(*selected_agent["tools"])
+
+    def start(self, text, cb=None, stream=False):
+        return _run(lambda relay: self.astart(text, cb=relay, stream=stream), cb)
+
+    async def astart(self, text, cb=None, stream=False):
+        """
+        Start a new conversation with the agent, dropping any history
+        """
+        return await self.achat(_starter_messages(self.selected_agent(), self.agent, text), cb, stream)
+
+    def send(self, text, cb=None, stream=False):
+        return _run(lambda relay: self.asend(text, cb=relay, stream=stream), cb)
+
+    async def asend(self, text, cb=None, stream=False):
+        """
+        Continue the conversation with a user message (starting one if empty)
+        """
+        if not self.messages:
+            return await self.astart(text, cb, stream)
+        return await self.achat(self.messages + [{"role": "user", "content": text}], cb, stream)
+
+    def chat(self, messages, cb=None, stream=False):
+        return _run(lambda relay: self.achat(messages, cb=relay, stream=stream), cb)
+
+    async def achat(self, messages, cb=None, stream=False):
+        """
+        Run the llm <-> tool loop on messages and keep the result as this
+        session's history; each call is timed as one turn
+        """
+        with metrics.span("chat.turn", agent=self.agent) as turn:
+            try:
+                result = await self._achat(messages, cb, stream)
+                self._remember(messages, result)
+                return self.messages
+            finally:
+                self.last_turn = metrics.last_turn = turn
+
+    def _remember(self, sent, result):
+        if self.conversation_store is None:
+            self.messages = result
+            return
+        # sent continues the stored conversation when it extends what was
+        # stored last time (callers may have appended to self.messages in place)
+        count, last = self._stored
+        continued = (
+            self.conversation_id is not None
+            and 0 < count <= len(sent)
+            and sent[count - 1] is last
+        )
+        with metrics.span("store.append"):
+            if not continued:
+                self.conversation_id = self.conversation_store.create(
+                    self.agent, self.provider, self.model
+                )
+                count = 0
+            self.conversation_store.append(self.conversation_id, result[count:])
+        self.messages = _window(result, store.get_window())
+        self._stored = (len(self.messages), self.messages[-1])
+
+    async def _achat(self, messages, cb, stream):
+        all_tools = agent_tools = await self.agent_tools()
+        tool_selection = (self.selected_agent() or {}).get("tool_selection")
+        if agent_tools and tool_selection:
+            with metrics.span("tools.select"):
+                agent_tools = await toolselect.select_tools(
+                    _last_user_text(messages), all_tools, tool_selection, self.provider
+                )
+        messages = messages.copy()
+        if _has_stored_results(messages):
+            all_tools, agent_tools = _with_read_result(all_tools), _with_read_result(agent_tools)
+        response = await self._llm_response(messages, agent_tools, cb, stream)
+        messages.append(response)
+        while "tool_calls" in response:
+            if _calls_pruned_tool(response["tool_calls"], agent_tools):
+                # The model wants a tool that selection left out; offer everything
+                agent_tools = all_tools
+            tools_responses = await _acall_tools(response["tool_calls"], cb=cb)
+            with metrics.span("tools.serialize"):
+                messages.append({
+                    "role": "tool",
+                    "content": json.dumps(tools_responses)
+                })
+            if _has_stored_results(messages[-1:]):
+                all_tools, agent_tools = _with_read_result(all_tools), _with_read_result(agent_tools)
+            response = await self._llm_response(messages, agent_tools, cb, stream)
+            messages.append(response)
+        return messages
+
+    async def _llm_response(self, messages, agent_tools, cb, stream):
+        provider, model = self.provider, self.model
+        with metrics.span("context.fit"):
+            messages = context.fit(messages, configs.get_context_budget(model), agent_tools)
+        with metrics.span("llm.response", model=model, stream=stream):
+            if not stream:
+                return await llms.achat(provider=provider, model=model, messages=messages, tools=agent_tools)
+            response = None
+            start = time.perf_counter()
+            events = await llms.achat(
+                provider=provider, model=model, messages=messages, tools=agent_tools, stream=True
+            )
+            async for event_type, event_data in events:
+                if start is not None:
+                    metrics.add_span("llm.first_token", time.perf_counter() - start, model=model)
+                    start = None
+                if event_type == "message":
+                    response = event_data
+                elif cb:
+                    cb(event_type, event_data)
+            return response
+
+
+# The module-level functions below drive a default session, for single-user
+# callers like the CLI
 
 def init():
-    global provider, model, agent
-    
+    _run(lambda _: ainit())
+
+async def ainit():
+    global _default_session
+
+    # MCP servers are discovered on first use by an agent that needs them
     if configs._config is None:
         configs.init()
-    asyncio.run(tools.init())
-    default_model = configs.get_default_model()
-    if default_model and "/" in default_model:
-        provider, model = default_model.split("/")
-    agent = configs.get_default_agent()
+    _default_session = ChatSession(conversation_store=store.get_store())
+    reload_settings = configs.get_config_reload_settings()
+    if reload_settings.get("enabled"):
+        # Edits to config.yaml apply without a restart
+        configs.watch(reload_settings.get("interval", configs.DEFAULT_RELOAD_INTERVAL))
+    settings = configs.get_warmup_settings()
+    if settings.get("enabled"):
+        # In the background: the first turn may wait on a model load, startup doesn't
+        _start_keep_warm(settings.get("interval"))
+
+def _configured_models():
+    models = {tuple(_split_model(configs.get_default_model()))}
+    models.update(tuple(_split_model(a.get("model"))) for a in configs.get_agents())
+    return sorted(m for m in models if m[0])
+
+async def warm_up():
+    """
+    Load every model named by default_model or an agent into memory, so the
+    first turn doesn't wait for it; failures are reported, not raised
+    """
+    async def preload(provider, model):
+        try:
+            with metrics.span("llm.warmup", model=model):
+                await llms.apreload(provider, model)
+        except Exception as e:
+            print(f"Could not warm up {provider}/{model}: {e}")
+
+    await asyncio.gather(*(preload(p, m) for p, m in _configured_models()))
+
+_keep_warm_task = None
+
+def _start_keep_warm(interval=None):
+    # Loads models now, then every interval seconds (if any) so ollama's
+    # keep_alive doesn't unload them; one ticker per process
+    global _keep_warm_task
+    if _keep_warm_task is not None and _keep_warm_task.get_loop() is asyncio.get_running_loop():
+        if not _keep_warm_task.done():
+            return
+    stop_keep_warm()
+
+    async def tick():
+        while True:
+            await warm_up()
+            if not interval:
+                return
+            await asyncio.sleep(interval)
+
+    _keep_warm_task = asyncio.get_running_loop().create_task(tick())
+
+def stop_keep_warm():
+    task = _keep_warm_task
+    if task is not None and not task.done() and not task.get_loop().is_closed():
+        task.get_loop().call_soon_threadsafe(task.cancel)
+
+def default_session():
+    global _default_session
+    if _default_session is None:
+        _default_session = ChatSession(conversation_store=store.get_store())
+    return _default_session
+
+def __getattr__(name):
+    # provider, model and agent used to be module globals
+    if name in ("provider", "model", "agent"):
+        return getattr(_default_session, name) if _default_session else None
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def _get_selected_agent(agent_name=None):
-    global agent
     if agent_name is None:
-        if not agent:
-            agent = configs.get_default_agent()
-        agent_name = agent
-    agents = configs.get_agents()
-    selected_agent = next((a for a in agents if a["name"] == agent_name), None)
-    
-    return selected_agent
+        return default_session().selected_agent()
+    return configs.get_agent(agent_name)
 
-def _starter_messages(agent_name, text):
-    selected_agent = _get_selected_agent(agent_name)
+def _starter_messages(selected_agent, agent_name, text):
     if not selected_agent:
         raise ValueError(f"Agent '{agent_name}' not found")
     messages = [
@@ -45,23 +341,55 @@ def _starter_messages(agent_name, text):
     
     return messages
 
-def start_chat(agent_name, text, cb=None):
+def start_chat(agent_name, text, cb=None, stream=False):
     # start a chat with the agent
     # example:
     # start_chat("helpful", "list 10 slack users")
-    messages = _starter_messages(agent_name, text)
-    return chat(messages, cb=cb)
+    return _run(lambda relay: astart_chat(agent_name, text, cb=relay, stream=stream), cb)
+
+def _window(messages, limit=None):
+    # Leading system messages plus the most recent whole turns that fit limit;
+    # a turn cut in half would leave tool results without their call
+    head = 0
+    while head < len(messages) and messages[head]["role"] == "system":
+        head += 1
+    turns = [t for t in context._split_turns(messages[head:]) if t[0]["role"] == "user"]
+    kept = []
+    for turn in reversed(turns):
+        if kept and limit is not None and len(kept) + len(turn) > limit:
+            break
+        kept[:0] = turn
+    return messages[:head] + kept
+
+async def astart_chat(agent_name, text, cb=None, stream=False):
+    session = default_session()
+    if agent_name != session.agent:
+        default = session
+        session = ChatSession(agent_name, conversation_store=default.conversation_store)
+        if not _switch_resets_model(default.agent, agent_name):
+            session.set_provider_and_model(default.provider, default.model)
+    return await session.astart(text, cb=cb, stream=stream)
+
+def resume(conversation_id):
+    """
+    Make a stored conversation the default session; returns its messages
+    """
+    global _default_session
+    conversation_store = store.get_store()
+    if conversation_store is None:
+        raise ValueError("No conversation_store is configured")
+    _default_session = ChatSession.resume(conversation_id, conversation_store)
+    return _default_session.messages
 
 def set_provider_and_model(new_provider, new_model):
-    global provider, model
-    provider = new_provider
-    model = new_model
+    default_session().set_provider_and_model(new_provider, new_model)
 
 def set_agent(agent_name):
-    global agent
-    agent = agent_name
+    default_session().set_agent(agent_name)
 
 def _process_tool_result(tool_result):
+    if isinstance(tool_result, list):
+        return [_process_tool_result(item) for item in tool_result]
     if isinstance(tool_result, dict) and "text" in tool_result and isinstance(tool_result["text"], str):
         try:
             nested_result = json.loads(tool_result["text"])
@@ -72,64 +400,115 @@ def _process_tool_result(tool_result):
     return tool_result
 
 
-def _call_tools(tool_calls, cb=None):
-    tool_results = []
+async def _acall_tools(tool_calls, cb=None):
     for tool_call in tool_calls:
-        if tool_call["type"] == "function":
-            function_name = tool_call["function"]["name"]
-            function_args = tool_call["function"]["arguments"]
-            if isinstance(function_args, str):
-                try:
-                    function_args = json.loads(function_args)
-                except json.JSONDecodeError:
-                    pass
+        if tool_call["type"] != "function":
+            raise ValueError(f"Unexpected tool call type: {tool_call['type']}")
+    semaphore = asyncio.Semaphore(configs.get_max_concurrent_tool_calls())
+
+    async def call(tool_call):
+        function_name = tool_call["function"]["name"]
+        function_args = tool_call["function"]["arguments"]
+        if isinstance(function_args, str):
+            try:
+                function_args = json.loads(function_args)
+            except json.JSONDecodeError:
+                pass
+        async with semaphore:
             if cb:
                 cb("tool_call", {
+                    "id": tool_call.get("id"),
                     "tool": function_name,
                     "arguments": function_args
                 })
-            tool_result = asyncio.run(tools.call_tool(function_name, function_args))
+            if function_name == results.READ_RESULT_TOOL_NAME:
+                # Arguments that aren't even a JSON object read as missing
+                read_args = function_args if isinstance(function_args, dict) else {}
+                tool_result = results.read(
+                    read_args.get("handle"),
+                    read_args.get("offset"),
+                    read_args.get("limit"),
+                )
+            else:
+                on_progress = None
+                if cb:
+                    on_progress = lambda progress: cb("tool_progress", {
+                        "id": tool_call.get("id"),
+                        "tool": function_name,
+                        **progress
+                    })
+                tool_result = await tools.call_tool(
+                    function_name, function_args, on_progress=on_progress
+                )
+        with metrics.span("tools.process_result", tool=function_name):
             processed_result = _process_tool_result(tool_result)
-            if cb:
-                cb("tool_result", {
-                    "tool": function_name,
-                    "result": processed_result
-                })
-            tool_results.append({
+            model_result, handle = processed_result, None
+            if function_name != results.READ_RESULT_TOOL_NAME:
+                # Large payloads stay out of the conversation; the UI still gets them
+                model_result, handle = results.compact(function_name, processed_result)
+        if cb:
+            cb("tool_result", {
+                "id": tool_call.get("id"),
                 "tool": function_name,
                 "result": processed_result,
+                "handle": handle
             })
-        else:
-            raise ValueError(f"Unexpected tool call type: {tool_call['type']}")
-    return tool_results
+        return {
+            "tool": function_name,
+            "result": model_result,
+        }
+
+    return list(await asyncio.gather(*(call(tool_call) for tool_call in tool_calls)))
 
 
-def chat(messages, cb=None):
+def _call_tools(tool_calls, cb=None):
+    # Independent tool calls run concurrently; results keep the model's order
+    return _run(lambda relay: _acall_tools(tool_calls, cb=relay), cb)
+
+
+def chat(messages, cb=None, stream=False):
     # chats with the llm, invoking tools as needed
     # returns a list of updatedmessages, containing the agent's response and the tool calls
-    # cb is a callback function that is called on two events:
+    # cb is a callback function that is called on these events:
     # - when a tool call is made
+    # - when a running tool reports progress
     # - when a tool call returns a result (or error)
-    global provider, model, agent
-    
-    if not provider or not model:
-        default_model = configs.get_default_model()
-        if default_model and "/" in default_model:
-            provider, model = default_model.split("/")
-    selected_agent = _get_selected_agent()
-    agent_tools = None
-    if selected_agent and selected_agent.get("enable_tools") and "tools" in selected_agent:
-        agent_tools = tools.get_tools(*selected_agent["tools"])
-    messages = messages.copy()
-    response = llms.chat(provider=provider, model=model, messages=messages, tools=agent_tools)
-    messages.append(response)
-    while "tool_calls" in response:
-        tools_responses = _call_tools(response["tool_calls"], cb=cb)
-        messages.append({
-            "role": "tool",
-            "content": json.dumps(tools_responses)
-        })
-        response = llms.chat(provider=provider, model=model, messages=messages, tools=agent_tools)
-        messages.append(response)
-    return messages
+    # - when stream is on, for every token of text the model generates
+    return _run(lambda relay: achat(messages, cb=relay, stream=stream), cb)
+
+
+async def achat(messages, cb=None, stream=False):
+    # async counterpart of chat; the whole llm <-> tool loop runs on the caller's loop
+    return await default_session().achat(messages, cb=cb, stream=stream)
+
+
+def _last_user_text(messages):
+    return next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+
+
+def _has_stored_results(messages):
+    # Tool messages hold the JSON list of {"tool", "result"} built by _acall_tools
+    for m in messages:
+        if m["role"] != "tool":
+            continue
+        try:
+            responses = json.loads(m.get("content") or "")
+        except json.JSONDecodeError:
+            continue
+        if isinstance(responses, list) and any(
+            isinstance(r, dict) and results.is_truncated_page(r.get("result"))
+            for r in responses
+        ):
+            return True
+    return False
+
+
+def _with_read_result(tool_list):
+    if tool_list is None or results.READ_RESULT_TOOL in tool_list:
+        return tool_list
+    return tool_list + [results.READ_RESULT_TOOL]
+
 
+def _calls_pruned_tool(tool_calls, agent_tools):
+    offered = {tool["function"]["name"] for tool in agent_tools or []}
+    return any(call["function"]["name"] not in offered for call in tool_calls)
@@ -1,35 +1,419 @@
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.sse import sse_client
-from mcp.types import JSONRPCMessage, JSONRPCRequest, JSONRPCResponse, JSONRPCError
+from mcp.types import (
+    JSONRPCError,
+    JSONRPCMessage,
+    JSONRPCNotification,
+    JSONRPCRequest,
+    JSONRPCResponse,
+    ProgressNotification,
+    ServerNotification,
+)
 import anyio
-from jarbas import configs
+import asyncio
+import copy
+import hashlib
+import itertools
+import json
+import os
+import re
+import time
+from jarbas import configs, metrics
+from jarbas.cache import LRUCache, MISSING
 import fnmatch
 
 tools = {}
+discovery_report = {}
 
-async def init():
+DEFAULT_IDLE_TIMEOUT = 300
+DEFAULT_HEALTH_CHECK_INTERVAL = 60
+DEFAULT_HEALTH_CHECK_TIMEOUT = 5
+DEFAULT_DISCOVERY_TIMEOUT = 10
+DEFAULT_CACHE_ENTRIES = 512
+DEFAULT_CACHE_TTL = 60
+DEFAULT_CATALOG_CACHE_TTL = 3600
+DEFAULT_RETRY_INTERVAL = 30
+
+_sessions = {}
+_session_locks = {}
+_pool_loop = None
+_result_cache = None
+_catalog_version = 0
+_resolved_tools = {}
+_catalog_cache = None
+_background_tasks = set()
+_progress_tokens = itertools.count(1)
+# Closes idle and dead sessions in the background while any are pooled
+_maintenance_task = None
+# server name -> the tools dict it was loaded into, so a reset catalog reloads
+_loaded_servers = {}
+_failed_servers = {}
+
+
+class _PooledSession:
+    """A long-lived MCP session kept open by a background task."""
+
+    def __init__(self, server):
+        self.name = server["name"]
+        self.url = server["url"]
+        self.session = None
+        self.write = None
+        self.in_use = 0
+        self.last_used = time.monotonic()
+        self.last_checked = self.last_used
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._task = None
+        self._error = None
+        self.timings = {}
+        # progressToken -> callback of the tool call that asked for progress
+        self.progress_handlers = {}
+
+    @property
+    def alive(self):
+        return self.session is not None and not self._closing.is_set()
+
+    async def open(self):
+        self._task = asyncio.create_task(self._run())
+        try:
+            await self._ready.wait()
+        except asyncio.CancelledError:
+            self._task.cancel()
+            raise
+        for phase, seconds in self.timings.items():
+            metrics.add_span(phase, seconds, server=self.name)
+        if self._error is not None:
+            raise self._error
+
+    async def close(self):
+        self._closing.set()
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def request(self, coro):
+        """Await coro, failing fast with ConnectionError if the session dies."""
+        call = asyncio.ensure_future(coro)
+        closed = asyncio.ensure_future(self._closing.wait())
+        try:
+            await asyncio.wait({call, closed}, return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            call.cancel()
+            raise
+        finally:
+            closed.cancel()
+        if call.done():
+            return call.result()
+        call.cancel()
+        raise ConnectionError(f"MCP session to '{self.name}' was closed")
+
+    async def _run(self):
+        try:
+            start = time.perf_counter()
+            async with sse_client(self.url) as (read, write):
+                self.timings["mcp.sse_connect"] = time.perf_counter() - start
+                async with ClientSession(read, write, sampling_callback=None) as session:
+                    start = time.perf_counter()
+                    await session.initialize()
+                    self.timings["mcp.initialize"] = time.perf_counter() - start
+                    self.session, self.write = session, write
+                    self._ready.set()
+                    drain = asyncio.create_task(self._drain(session))
+                    try:
+                        await self._closing.wait()
+                    finally:
+                        drain.cancel()
+        except Exception as e:
+            self._error = e
+        finally:
+            self.session = None
+            self.write = None
+            self._closing.set()
+            self._ready.set()
+
+    async def _drain(self, session):
+        # Server notifications must be consumed or the session's receive loop
+        # blocks; the stream ends when the connection drops.
+        try:
+            async for message in session.incoming_messages:
+                if isinstance(message, ServerNotification) and isinstance(
+                    message.root, ProgressNotification
+                ):
+                    self._progress(message.root.params)
+        finally:
+            self._closing.set()
+
+
+    def _progress(self, params):
+        handler = self.progress_handlers.get(params.progressToken)
+        if handler is None:
+            return  # the call already finished
+        try:
+            handler({"progress": params.progress, "total": params.total})
+        except Exception as e:
+            # A broken callback must not take the session down with it
+            print(f"Error in progress callback for {self.name}: {e}")
+
+
+def _reset_pool_if_loop_changed():
+    global _pool_loop
+    loop = asyncio.get_running_loop()
+    if _pool_loop is not loop:
+        # Sessions bound to a previous event loop can't be reused or awaited.
+        _sessions.clear()
+        _session_locks.clear()
+        _pool_loop = loop
+
+
+async def _evict_idle_sessions():
+    idle_timeout = configs.get_mcp_pool_settings().get(
+        "idle_timeout", DEFAULT_IDLE_TIMEOUT
+    )
+    now = time.monotonic()
+    for name, pooled in list(_sessions.items()):
+        if pooled.in_use == 0 and now - pooled.last_used > idle_timeout:
+            _sessions.pop(name, None)
+            await pooled.close()
+
+
+async def _is_healthy(pooled):
+    settings = configs.get_mcp_pool_settings()
+    interval = settings.get("health_check_interval", DEFAULT_HEALTH_CHECK_INTERVAL)
+    if not pooled.alive:
+        return False
+    if pooled.in_use or time.monotonic() - pooled.last_checked < interval:
+        return True
+    try:
+        await asyncio.wait_for(
+            pooled.request(_send_request(pooled, "ping")),
+            settings.get("health_check_timeout", DEFAULT_HEALTH_CHECK_TIMEOUT),
+        )
+    except Exception:
+        return False
+    pooled.last_checked = time.monotonic()
+    return True
+
+
+async def _acquire_session(server):
+    _reset_pool_if_loop_changed()
+    await _evict_idle_sessions()
+    name = server["name"]
+    lock = _session_locks.setdefault(name, asyncio.Lock())
+    async with lock:
+        pooled = _sessions.get(name)
+        if pooled is not None and not await _is_healthy(pooled):
+            _sessions.pop(name, None)
+            await pooled.close()
+            pooled = None
+        if pooled is None:
+            pooled = _PooledSession(server)
+            with metrics.span("mcp.connect", server=name):
+                await pooled.open()
+            _sessions[name] = pooled
+            _start_maintenance()
+        pooled.last_used = time.monotonic()
+        return pooled
+
+
+def _start_maintenance():
+    global _maintenance_task
+    loop = asyncio.get_running_loop()
+    if _maintenance_task is None or _maintenance_task.done() or _maintenance_task.get_loop() is not loop:
+        _maintenance_task = loop.create_task(_maintain_sessions())
+
+
+async def _maintain_sessions():
+    # Idle sessions are closed on time even if no further call comes to notice
+    while _sessions:
+        settings = configs.get_mcp_pool_settings()
+        await asyncio.sleep(min(
+            settings.get("idle_timeout", DEFAULT_IDLE_TIMEOUT),
+            settings.get("health_check_interval", DEFAULT_HEALTH_CHECK_INTERVAL),
+        ))
+        await _evict_idle_sessions()
+        for name, pooled in list(_sessions.items()):
+            async with _session_locks.setdefault(name, asyncio.Lock()):
+                if _sessions.get(name) is not pooled or pooled.in_use:
+                    continue
+                if not await _is_healthy(pooled) and not pooled.in_use:
+                    _sessions.pop(name, None)
+                    await pooled.close()
+
+
+async def _discard_session(name):
+    pooled = _sessions.pop(name, None)
+    if pooled is not None:
+        await pooled.close()
+
+
+async def close_sessions():
+    """
+    Close every pooled MCP session
+    """
+    _reset_pool_if_loop_changed()
+    if _maintenance_task is not None and _maintenance_task.get_loop() is asyncio.get_running_loop():
+        _maintenance_task.cancel()
+    for name in list(_sessions):
+        await _discard_session(name)
+
+
+async def init(server_names=None):
     """
     Initialize mcp_tools from config.yaml
+    Servers are queried concurrently; a server that fails or exceeds its
+    discovery_timeout is reported in discovery_report and skipped.
+    With tool_catalog_cache configured, catalogs saved by a previous run are
+    used instead, and stale ones are refreshed in the background.
+    server_names limits discovery to those servers.
     """
     # Load the configuration if not already loaded
     if configs._config is None:
         configs.init()
-    
+
     # Get all MCP servers from the config
     mcp_servers = configs.get_mcp_servers()
-    
-    # Load tools from each server
-    for server in mcp_servers:
-        server_tools = await _load_tools(server["url"])
-        
-        # Add tools to the global tools dictionary with server name prefix
-        # The ListToolsResult object contains a 'tools' attribute, not 'items'
-        for tool in server_tools.tools:
-            prefixed_name = f"{server['name']}.{tool.name}"
-            tools[prefixed_name] = _tool_dict(server['name'], tool)
-    
+    if server_names is not None:
+        mcp_servers = [s for s in mcp_servers if s["name"] in server_names]
+
+    results = await asyncio.gather(*(_discover(server) for server in mcp_servers))
+    for server, server_tools in zip(mcp_servers, results):
+        if server_tools is not None:
+            _set_server_tools(server["name"], server_tools)
+            _loaded_servers[server["name"]] = tools
+        else:
+            _failed_servers[server["name"]] = time.monotonic()
+    _catalog_changed()
+
     return tools
 
+async def ensure_tools(*patterns):
+    """
+    Discover only the servers that tool patterns refer to, if not loaded yet
+    example:
+    - await ensure_tools("slack.*") connects to the slack server alone
+    """
+    if configs._config is None:
+        configs.init()
+    now = time.monotonic()
+    missing = [
+        server["name"]
+        for server in configs.get_mcp_servers()
+        if _loaded_servers.get(server["name"]) is not tools
+        and now - _failed_servers.get(server["name"], -DEFAULT_RETRY_INTERVAL)
+        >= DEFAULT_RETRY_INTERVAL
+        and any(
+            fnmatch.fnmatchcase(server["name"], pattern.split(".", 1)[0])
+            for pattern in patterns
+        )
+    ]
+    if missing:
+        await init(missing)
+
+def _set_server_tools(server_name, server_tools):
+    prefix = f"{server_name}."
+    for name in [name for name in tools if name.startswith(prefix)]:
+        del tools[name]
+    for tool_def in server_tools:
+        tools[tool_def["function"]["name"]] = tool_def
+
+def _discovery_timeout(server):
+    return server.get(
+        "discovery_timeout",
+        configs.get_mcp_pool_settings().get(
+            "discovery_timeout", DEFAULT_DISCOVERY_TIMEOUT
+        ),
+    )
+
+async def _discover(server):
+    start = time.monotonic()
+    cached = _cached_catalog(server)
+    if cached is not None:
+        discovery_report[server["name"]] = {
+            "status": "cached",
+            "seconds": time.monotonic() - start,
+            "tools": len(cached["tools"]),
+            "error": None,
+        }
+        if time.time() - cached["fetched_at"] > _catalog_cache_ttl():
+            _spawn(_revalidate(server, cached["hash"]))
+        return cached["tools"]
+
+    timeout = _discovery_timeout(server)
+    report = {"status": "ok", "seconds": 0.0, "tools": 0, "error": None}
+    server_tools = None
+    try:
+        result = await asyncio.wait_for(_load_tools(server), timeout)
+        # The ListToolsResult object contains a 'tools' attribute, not 'items'
+        server_tools = [_tool_dict(server["name"], tool) for tool in result.tools]
+        report["tools"] = len(server_tools)
+        _store_catalog(server, server_tools)
+    except asyncio.TimeoutError:
+        report["status"] = "timeout"
+        report["error"] = f"no response within {timeout}s"
+    except Exception as e:
+        report["status"] = "error"
+        report["error"] = str(e)
+    report["seconds"] = time.monotonic() - start
+    discovery_report[server["name"]] = report
+    if report["error"]:
+        print(f"Skipping MCP server '{server['name']}': {report['error']}")
+    return server_tools
+
+async def _revalidate(server, known_hash):
+    try:
+        result = await asyncio.wait_for(_load_tools(server), _discovery_timeout(server))
+    except Exception:
+        return
+    server_tools = [_tool_dict(server["name"], tool) for tool in result.tools]
+    if _store_catalog(server, server_tools) != known_hash:
+        _set_server_tools(server["name"], server_tools)
+        _catalog_changed()
+
+def _catalog_cache_ttl():
+    return configs.get_tool_catalog_cache_settings().get(
+        "ttl", DEFAULT_CATALOG_CACHE_TTL
+    )
+
+def _load_catalog_cache():
+    global _catalog_cache
+    if _catalog_cache is None:
+        _catalog_cache = {}
+        path = configs.get_tool_catalog_cache_settings().get("path")
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r") as file:
+                    _catalog_cache = json.load(file)
+            except (OSError, json.JSONDecodeError):
+                pass
+    return _catalog_cache
+
+def _cached_catalog(server):
+    if not configs.get_tool_catalog_cache_settings().get("path"):
+        return None
+    cached = _load_catalog_cache().get(server["name"])
+    if cached is None or cached.get("url") != server["url"]:
+        return None
+    return cached
+
+def _store_catalog(server, server_tools):
+    catalog_hash = hashlib.sha256(
+        json.dumps(server_tools, sort_keys=True, default=str).encode()
+    ).hexdigest()
+    path = configs.get_tool_catalog_cache_settings().get("path")
+    if not path:
+        return catalog_hash
+    _load_catalog_cache()[server["name"]] = {
+        "url": server["url"],
+        "hash": catalog_hash,
+        "fetched_at": time.time(),
+        "tools": server_tools,
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as file:
+        json.dump(_catalog_cache, file)
+    os.replace(temp_path, path)
+    return catalog_hash
+
 def _tool_dict(server_name, tool):
     return {
         "type": "function",
@@ -43,87 +427,206 @@ def _tool_dict(server_name, tool):
 def get_tools(*names):
     """
     Get tool definitions from in memory cache
+    Patterns use fnmatch globs and are resolved once per catalog version.
     example:
     - tools = get_tools("slack.*", "youtube.*")
     - tools = get_tools("slack.get_slack_users", "youtube.*")
     """
     if not names:
         return tools
-    result = []
-    for pattern in names:
-        if pattern.endswith(".*"):
-            prefix = pattern[:-1]
-            for tool_name, tool_def in tools.items():
-                if tool_name.startswith(prefix):
-                    result.append(tool_def)
-        elif pattern in tools:
-            result.append(tools[pattern])
-    return result
-
-async def call_tool(name, arguments):
+    token = (id(tools), len(tools), _catalog_version)
+    resolved = _resolved_tools.get(names)
+    if resolved is None or resolved[0] != token:
+        resolved = (token, _resolve_tools(names))
+        _resolved_tools[names] = resolved
+    return resolved[1]
+
+def _resolve_tools(patterns):
+    result = {}
+    for pattern in patterns:
+        if pattern in tools:
+            result.setdefault(pattern, tools[pattern])
+            continue
+        match = re.compile(fnmatch.translate(pattern)).match
+        for tool_name, tool_def in tools.items():
+            if match(tool_name):
+                result.setdefault(tool_name, tool_def)
+    return list(result.values())
+
+def _catalog_changed():
+    global _catalog_version
+    _catalog_version += 1
+    _resolved_tools.clear()
+
+def _on_config_change(changes):
+    global _result_cache
+    if "tool_cache" in changes["settings"]:
+        # Rebuilt with the new size on next use; cached results may no longer
+        # match the new rules
+        _result_cache = None
+    # Removed or reconfigured servers lose their tools and pooled session;
+    # ensure_tools discovers changed and added ones when an agent needs them
+    servers = changes["mcp_servers"]
+    stale = servers["removed"] + servers["changed"]
+    if not stale:
+        return
+    loop = _pool_loop
+    if loop is not None and loop.is_running():
+        # Runs on the pool's loop, which owns the sessions and the catalog
+        loop.call_soon_threadsafe(_drop_servers, stale)
+    else:
+        _drop_servers(stale)
+
+def _drop_servers(server_names):
+    try:
+        running = asyncio.get_running_loop() is _pool_loop
+    except RuntimeError:
+        running = False
+    try:
+        for name in server_names:
+            _set_server_tools(name, [])
+            _loaded_servers.pop(name, None)
+            _failed_servers.pop(name, None)
+            discovery_report.pop(name, None)
+            pooled = _sessions.pop(name, None)
+            if pooled is not None and running:
+                _spawn(pooled.close())
+            # Otherwise its loop is gone, and the session with it
+    finally:
+        _catalog_changed()
+
+configs.add_listener(_on_config_change)
+
+def _cache_rule(name):
+    settings = configs.get_tool_cache_settings()
+    rule = next(
+        (r for r in settings.get("rules", []) if fnmatch.fnmatch(name, r["pattern"])),
+        None,
+    )
+    if rule is None or not rule.get("cacheable", True):
+        return None
+    return {"ttl": rule.get("ttl", settings.get("default_ttl", DEFAULT_CACHE_TTL))}
+
+def _get_result_cache():
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = LRUCache(
+            configs.get_tool_cache_settings().get("max_entries", DEFAULT_CACHE_ENTRIES)
+        )
+    return _result_cache
+
+def _cache_key(name, arguments):
+    return name + "\0" + json.dumps(
+        arguments, sort_keys=True, separators=(",", ":"), default=str
+    )
+
+def cache_stats():
+    """
+    Hit/miss counters and size of the tool result cache
+    """
+    return _get_result_cache().stats()
+
+def clear_cache():
+    _get_result_cache().clear()
+
+async def call_tool(name, arguments, on_progress=None):
     """
     Call a tool
+    Results of tools marked cacheable in tool_cache are served from memory
+    until their TTL expires.
+    on_progress, if given, is called with {"progress", "total"} each time the
+    server reports progress on the call (total may be None).
     """
-    if not tools:
-        await init()
-    
-    if name not in tools:
-        return {
-            "type": "error",
-            "code": -32601,
-            "message": f"Tool not found: {name}"
-        }
-    
+    with metrics.span("tools.call", tool=name) as span:
+        await ensure_tools(name)
+
+        if name not in tools:
+            return {
+                "type": "error",
+                "code": -32601,
+                "message": f"Tool not found: {name}"
+            }
+
+        rule = _cache_rule(name)
+        if rule is None:
+            return await _call_tool_uncached(name, arguments, on_progress)
+        key = _cache_key(name, arguments)
+        result = _get_result_cache().get(key)
+        span.attributes["cached"] = result is not MISSING
+        if result is MISSING:
+            result = await _call_tool_uncached(name, arguments, on_progress)
+            if not (isinstance(result, dict) and result.get("type") == "error"):
+                _get_result_cache().set(key, result, ttl=rule["ttl"])
+        return copy.deepcopy(result)
+
+async def _call_tool_uncached(name, arguments, on_progress=None):
     # Extract server name from the prefixed tool name
     server_name = name.split('.')[0]
     tool_name = name[len(server_name) + 1:]  # +1 for the dot
-    
-    # Get the URL for the server
-    mcp_servers = configs.get_mcp_servers()
-    server_url = None
-    for server in mcp_servers:
-        if server["name"] == server_name:
-            server_url = server["url"]
-            break
-    
-    if not server_url:
+
+    server = configs.get_mcp_server(server_name)
+    if not server:
         return {
             "type": "error",
             "code": -32601,
             "message": f"Server not found for tool: {name}"
         }
-    
-    # Connect to the server and call the tool
-    async with sse_client(server_url) as (read, write):
-        async with ClientSession(read, write, sampling_callback=None) as session:
-            await session.initialize()
-            result = await _call_tool_lowlevel(session, write, tool_name, arguments)
-            return result
-
-async def _load_tools(url):
-    async with sse_client(url) as (read, write):
-        async with ClientSession(read, write, sampling_callback=None) as session:
-            await session.initialize()
-            tools = await session.list_tools()
-            return tools
-
-async def _call_tool_lowlevel(session, write, name, arguments):
-    jsonrpc_request = JSONRPCRequest(
-        jsonrpc = "2.0",
-        id = session._request_id,
-        method = "tools/call",
-        params = {
-            "name": name,
-            "arguments": arguments
+
+    # Request ids written to a session; once the call is out, retrying could
+    # run a non-idempotent tool twice
+    sent = []
+    try:
+        return await _with_session(
+            server,
+            lambda pooled: _call_tool_on(pooled, tool_name, arguments, on_progress, sent),
+            retry=lambda: not sent,
+        )
+    except ConnectionError as e:
+        if not sent:
+            raise
+        return {
+            "type": "error",
+            "code": -32000,
+            "message": f"Connection to '{server_name}' dropped during the call; "
+                       f"the tool may or may not have run: {e}"
         }
-    )
-    await write.send(JSONRPCMessage(jsonrpc_request))
-    response_stream, response_stream_reader = anyio.create_memory_object_stream[
-        JSONRPCResponse | JSONRPCError
-    ](1)
-    session._response_streams[session._request_id] = response_stream
-    response = await response_stream_reader.receive()
-    session._request_id += 1
+
+async def _with_session(server, call, retry=lambda: True):
+    # A dropped connection gets one transparent reconnect before failing,
+    # unless retry() says it's no longer safe
+    for attempt in range(2):
+        with metrics.span("mcp.acquire", server=server["name"]):
+            pooled = await _acquire_session(server)
+        pooled.in_use += 1
+        try:
+            with metrics.span("mcp.request", server=server["name"]):
+                return await pooled.request(call(pooled))
+        except ConnectionError:
+            await _discard_session(server["name"])
+            if attempt or not retry():
+                raise
+        finally:
+            pooled.in_use -= 1
+            pooled.last_used = time.monotonic()
+
+async def _load_tools(server):
+    return await _with_session(server, lambda pooled: pooled.session.list_tools())
+
+async def _call_tool_on(pooled, name, arguments, on_progress=None, sent=None):
+    """
+    Call a tool over a pooled session. A single content item is returned as
+    is, several as a list.
+    """
+    params = {"name": name, "arguments": arguments}
+    if on_progress is not None:
+        token = f"{name}-{next(_progress_tokens)}"
+        params["_meta"] = {"progressToken": token}
+        pooled.progress_handlers[token] = on_progress
+    try:
+        response = await _send_request(pooled, "tools/call", params, sent)
+    finally:
+        if on_progress is not None:
+            pooled.progress_handlers.pop(token, None)
     if isinstance(response, JSONRPCError):
         return {
             "type": "error",
@@ -132,5 +635,81 @@ async def _call_tool_lowlevel(session, write, name, arguments):
             "data": response.error.data
         }
     if 'toolResult' in response.result: # legacy server
-        return response.result['toolResult']['content'][0]
-    return response.result['content'][0]
+        content = response.result['toolResult']['content']
+    else:
+        content = response.result['content']
+    return content[0] if len(content) == 1 else content
+
+
+async def _send_request(pooled, method, params=None, sent=None):
+    """
+    Send one JSON-RPC request and wait for its response (or JSONRPCError).
+    Any number may be in flight on the same session: each gets its own id
+    and response stream. Cancelling tells the server to stop working on it.
+    The request id is appended to sent, if given, once it is written; a
+    connection that is already gone raises ConnectionError before that.
+    """
+    session, write = pooled.session, pooled.write
+    if session is None or write is None:
+        raise ConnectionError(f"MCP session to '{pooled.name}' was closed")
+    # ClientSession.send_request (mcp 1.3) leaks the response stream of a
+    # cancelled request and rejects legacy toolResult replies, so this reuses
+    # its id counter and response streams directly; mcp is pinned to 1.3.x
+    # in pyproject.toml for that reason.
+    # No await between reading and bumping the id, so concurrent calls never share one
+    request_id = session._request_id
+    session._request_id = request_id + 1
+    send, receive = anyio.create_memory_object_stream[JSONRPCResponse | JSONRPCError](1)
+    session._response_streams[request_id] = send
+    response = None
+    try:
+        try:
+            await write.send(
+                JSONRPCMessage(
+                    JSONRPCRequest(jsonrpc="2.0", id=request_id, method=method, params=params)
+                )
+            )
+        except (anyio.ClosedResourceError, anyio.BrokenResourceError) as e:
+            raise ConnectionError(f"MCP session to '{pooled.name}' was closed") from e
+        if sent is not None:
+            sent.append(request_id)
+        response = await receive.receive()
+        return response
+    except asyncio.CancelledError:
+        _spawn(_notify_cancelled(pooled, request_id))
+        raise
+    finally:
+        if response is None and session._response_streams.pop(request_id, None) is None:
+            # The session is handing us the response right now; closing the
+            # stream under it would break its receive loop
+            _spawn(_close_after_response(send, receive))
+        else:
+            send.close()
+            receive.close()
+
+
+async def _notify_cancelled(pooled, request_id):
+    try:
+        await pooled.write.send(
+            JSONRPCMessage(
+                JSONRPCNotification(
+                    jsonrpc="2.0",
+                    method="notifications/cancelled",
+                    params={"requestId": request_id, "reason": "Cancelled by client"},
+                )
+            )
+        )
+    except Exception:
+        pass  # the connection is gone, and the request with it
+
+
+async def _close_after_response(send, receive):
+    with send, receive:
+        with anyio.move_on_after(DEFAULT_HEALTH_CHECK_TIMEOUT):
+            await receive.receive()
+
+
+def _spawn(coro):
+    task = asyncio.get_running_loop().create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
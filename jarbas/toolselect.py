@@ -0,0 +1,115 @@
+import math
+import re
+from collections import Counter
+from jarbas import llms
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+MAX_INDEXES = 64
+
+_indexes = {}
+
+
+async def select_tools(query, candidates, settings, provider=None):
+    """
+    Rank candidate tool definitions against a user message and keep the top_k.
+    settings is an agent's tool_selection block:
+    - method: "bm25" (default) or "embeddings"
+    - top_k: how many tools to send to the model
+    - embedding_model: ollama model used when method is "embeddings"
+    Returns the candidates unchanged when there is nothing to prune, no tool
+    scores above zero, or embeddings can't be had (selection only saves
+    tokens, so it never fails a turn).
+    """
+    top_k = settings.get("top_k", 5)
+    if not query or len(candidates) <= top_k:
+        return candidates
+    index = _get_index(candidates)
+    if settings.get("method", "bm25") == "embeddings":
+        if not settings.get("embedding_model"):
+            print("Tool selection by embeddings needs an embedding_model; sending all tools")
+            return candidates
+        try:
+            scores = await _embedding_scores(
+                index, query, provider, settings["embedding_model"]
+            )
+        except Exception as e:
+            print(f"Error selecting tools by embeddings, sending all tools: {e}")
+            return candidates
+    else:
+        scores = _bm25_scores(index, query)
+    ranked = sorted(range(len(candidates)), key=lambda i: scores[i], reverse=True)
+    if scores[ranked[0]] <= 0:
+        return candidates
+    return [candidates[i] for i in ranked[:top_k]]
+
+
+def _tokenize(text):
+    return re.findall(r"[a-z0-9]+", (text or "").lower())
+
+
+def _tool_text(tool):
+    function = tool["function"]
+    parameters = (function.get("parameters") or {}).get("properties") or {}
+    return " ".join(
+        [function["name"], function.get("description") or ""] + list(parameters)
+    )
+
+
+def _get_index(candidates):
+    # Candidate lists come from tools.get_tools, which reuses the same list
+    # object until the catalog changes, so identity is a safe cache key.
+    cached = _indexes.get(id(candidates))
+    if cached is not None and cached["candidates"] is candidates:
+        return cached
+    docs = [Counter(_tokenize(_tool_text(tool))) for tool in candidates]
+    document_frequency = Counter(term for doc in docs for term in doc)
+    index = {
+        "candidates": candidates,
+        "docs": docs,
+        "lengths": [sum(doc.values()) for doc in docs],
+        "idf": {
+            term: math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+            for term, df in document_frequency.items()
+        },
+        "embeddings": {},
+    }
+    index["average_length"] = sum(index["lengths"]) / len(docs) or 1
+    if len(_indexes) >= MAX_INDEXES:
+        _indexes.clear()
+    _indexes[id(candidates)] = index
+    return index
+
+
+def _bm25_scores(index, query):
+    terms = [term for term in set(_tokenize(query)) if term in index["idf"]]
+    scores = []
+    for doc, length in zip(index["docs"], index["lengths"]):
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * length / index["average_length"])
+        scores.append(
+            sum(
+                index["idf"][term] * doc[term] * (BM25_K1 + 1) / (doc[term] + norm)
+                for term in terms
+                if term in doc
+            )
+        )
+    return scores
+
+
+async def _embedding_scores(index, query, provider, embedding_model):
+    tool_vectors = index["embeddings"].get(embedding_model)
+    if tool_vectors is None:
+        texts = [_tool_text(tool) for tool in index["candidates"]]
+        response = await llms.aembed(provider, embedding_model, texts)
+        tool_vectors = [_normalized(vector) for vector in response["embeddings"]]
+        index["embeddings"][embedding_model] = tool_vectors
+    response = await llms.aembed(provider, embedding_model, query)
+    query_vector = _normalized(response["embeddings"][0])
+    return [
+        sum(q * t for q, t in zip(query_vector, vector)) for vector in tool_vectors
+    ]
+
+
+def _normalized(vector):
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
@@ -0,0 +1,3 @@
+#!/bin/bash
+# Run the Jarbas HTTP chat API using uvicorn
+python -m jarbas.main_api
@@ -0,0 +1,49 @@
+"""Tests for the balancer module."""
+
+from jarbas import balancer
+
+
+def _pool(**settings):
+    return {
+        "name": "pool",
+        "type": "ollama-pool",
+        "backends": [{"url": "http://a:11434"}, {"url": "http://b:11434"}],
+        **settings,
+    }
+
+
+def test_least_outstanding_requests_wins():
+    pool = _pool()
+    first = balancer.acquire(pool, "m")
+    second = balancer.acquire(pool, "m")
+    assert first is not second, "Second request should go to the idle backend"
+
+    balancer.release(pool, first, "m", ok=True)
+    assert balancer.acquire(pool, "m") is first
+
+
+def test_model_affinity_outweighs_small_load_difference():
+    pool = _pool(affinity_weight=2)
+    a = balancer.acquire(pool, "llama")
+    balancer.release(pool, a, "llama", ok=True)
+    balancer.acquire(pool, "llama")
+
+    assert balancer.acquire(pool, "llama") is a, "Backend with the model loaded is preferred"
+    assert balancer.acquire(pool, "qwen") is not a, "Other models go by load alone"
+
+
+def test_failing_backend_is_ejected_until_timeout():
+    pool = _pool(eject_after_failures=2, eject_seconds=60, affinity_weight=0)
+
+    def request():
+        backend = balancer.acquire(pool, "m")
+        balancer.release(pool, backend, "m", ok=backend.url != "http://a:11434")
+        return backend
+
+    request(), request()
+    assert balancer.stats(pool)[0]["healthy"], "One failure should not eject"
+    request(), request()
+
+    a, b = balancer.stats(pool)
+    assert not a["healthy"] and b["healthy"]
+    assert all(request().url == "http://b:11434" for _ in range(3))
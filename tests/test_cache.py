@@ -0,0 +1,59 @@
+"""Tests for the cache module."""
+
+import time
+from jarbas.cache import LRUCache, MISSING, SqliteCache, TieredCache
+
+
+def test_get_returns_stored_value():
+    cache = LRUCache(max_entries=2)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.get("b") is MISSING
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is MISSING, "Least recently used entry should be evicted"
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_entries_expire_after_ttl():
+    cache = LRUCache()
+    cache.set("a", 1, ttl=0.05)
+    cache.set("b", 2)
+    time.sleep(0.1)
+    assert cache.get("a") is MISSING, "Expired entry should not be returned"
+    assert cache.get("b") == 2, "Entries without ttl should not expire"
+
+
+def test_sqlite_cache_persists_and_trims(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = SqliteCache(path, max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+
+    reopened = SqliteCache(path, max_entries=2)
+    assert reopened.get("a") == "1", "Entries should survive reopening the file"
+    assert reopened.get("c") == "3"
+    assert reopened.get("b") is MISSING, "Least recently used entry should be trimmed"
+
+
+def test_tiered_cache_promotes_hits(tmp_path):
+    memory = LRUCache()
+    disk = SqliteCache(str(tmp_path / "cache.sqlite"))
+    disk.set("a", "1")
+    cache = TieredCache(memory, disk)
+
+    assert cache.get("a") == "1"
+    assert memory.get("a") == "1", "Disk hit should be copied into memory"
+    assert cache.get("missing") is MISSING
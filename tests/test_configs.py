@@ -104,6 +104,7 @@ def test_set_default_agent(sample_config, temp_config_file):
     # Mock the open function for reading and writing
     with patch("jarbas.configs._config", mock_config), \
          patch("jarbas.configs.open", mock_open()), \
+         patch("jarbas.configs.os.replace"), \
          patch("yaml.dump") as mock_yaml_dump:
         
         configs.set_default_agent("unhelpful")
@@ -123,6 +124,7 @@ def test_set_default_model(sample_config, temp_config_file):
     # Mock the open function for reading and writing
     with patch("jarbas.configs._config", mock_config), \
          patch("jarbas.configs.open", mock_open()), \
+         patch("jarbas.configs.os.replace"), \
          patch("yaml.dump") as mock_yaml_dump:
         
         configs.set_default_model("gpt-4")
@@ -159,4 +161,103 @@ def test_init_file_not_found():
     """Test that init handles missing config file."""
     with patch("jarbas.configs.open", side_effect=FileNotFoundError("No such file")):
         with pytest.raises(FileNotFoundError):
-            configs.init() 
\ No newline at end of file
+            configs.init() 
+
+def test_lookups_by_name(sample_config):
+    """Test that agents, servers and providers are found by name."""
+    config = dict(sample_config, llm_providers=[{"name": "ollama-local", "type": "ollama"}])
+    with patch("jarbas.configs._config", config):
+        assert configs.get_agent("unhelpful") is config["agents"][1]
+        assert configs.get_mcp_server("youtube") is config["mcp_serrvers"][1]
+        assert configs.get_llm_provider("ollama-local")["type"] == "ollama"
+        assert configs.get_agent("nonexistent") is None
+    with patch("jarbas.configs._config", {}):
+        assert configs.get_agent("helpful") is None, "Indexes should follow the loaded config"
+
+
+def test_get_context_budget():
+    """Test that per-model budgets fall back to max_tokens."""
+    config = {"context_window": {"max_tokens": 8000, "models": {"qwen2.5": 32000}}}
+    with patch("jarbas.configs._config", config):
+        assert configs.get_context_budget("qwen2.5") == 32000
+        assert configs.get_context_budget("llama3.2") == 8000
+    with patch("jarbas.configs._config", {"context_window": {"max_tokens": 8000, "models": None}}):
+        assert configs.get_context_budget("qwen2.5") == 8000
+    with patch("jarbas.configs._config", {"context_window": None}):
+        assert configs.get_context_budget("qwen2.5") is None
+
+
+def test_save_config_replaces_file_atomically(sample_config, tmp_path):
+    """Test that _save_config writes a temporary file and renames it over the config."""
+    path = tmp_path / "config.yaml"
+    path.write_text("old: true\n")
+    with patch("jarbas.configs._config", sample_config):
+        configs._save_config(str(path))
+    assert yaml.safe_load(path.read_text()) == sample_config
+    assert not os.path.exists(f"{path}.tmp")
+
+
+def test_reload_applies_changes_and_notifies_listeners(sample_config, tmp_path):
+    """Test that reload diffs the file against the loaded config."""
+    path = tmp_path / "config.yaml"
+    path.write_text(yaml.dump(sample_config))
+    changes_seen = []
+    saved = (configs._config, configs._loaded_path, configs._loaded_stat)
+    try:
+        configs.init(str(path))
+        with patch("jarbas.configs._listeners", [changes_seen.append]):
+            updated = dict(sample_config)
+            updated["mcp_serrvers"] = [
+                {"name": "slack", "url": "http://localhost:9999/sse"},
+                {"name": "github", "url": "http://localhost:8205/sse"},
+            ]
+            updated["agents"] = [sample_config["agents"][1]]
+            updated["default_model"] = "llama3.2"
+            path.write_text(yaml.dump(updated))
+            changes = configs.reload()
+            assert configs.reload() == configs.diff({}, {}), \
+                "Reloading an unchanged file should change nothing"
+    finally:
+        configs._config, configs._loaded_path, configs._loaded_stat = saved
+
+    assert changes["mcp_servers"] == {"added": ["github"], "removed": ["youtube"], "changed": ["slack"]}
+    assert changes["agents"] == {"added": [], "removed": ["helpful"], "changed": []}
+    assert changes["settings"] == ["default_model"]
+    assert changes_seen == [changes], "Listeners should be told once, about real changes"
+
+
+def test_reload_keeps_unchanged_entries(sample_config, tmp_path):
+    """Test that entries that didn't change keep their identity across a reload."""
+    path = tmp_path / "config.yaml"
+    path.write_text(yaml.dump(sample_config))
+    saved = (configs._config, configs._loaded_path, configs._loaded_stat)
+    try:
+        configs.init(str(path))
+        slack = configs.get_mcp_server("slack")
+        path.write_text(yaml.dump(dict(sample_config, default_model="llama3.2")))
+        with patch("jarbas.configs._listeners", []):
+            configs.reload()
+        assert configs.get_default_model() == "llama3.2"
+        assert configs.get_mcp_server("slack") is slack
+    finally:
+        configs._config, configs._loaded_path, configs._loaded_stat = saved
+
+
+def test_reload_rejects_empty_file(sample_config, tmp_path):
+    """Test that an empty (half-written) file is not applied as an empty config."""
+    path = tmp_path / "config.yaml"
+    path.write_text(yaml.dump(sample_config))
+    saved = (configs._config, configs._loaded_path, configs._loaded_stat)
+    try:
+        configs.init(str(path))
+        loaded = configs._config
+        changes_seen = []
+        with patch("jarbas.configs._listeners", [changes_seen.append]):
+            for content in ("", "- just a list\n"):
+                path.write_text(content)
+                with pytest.raises(ValueError):
+                    configs.reload()
+        assert configs._config is loaded, "The loaded config should stay in place"
+        assert not changes_seen, "Listeners should not hear about a rejected file"
+    finally:
+        configs._config, configs._loaded_path, configs._loaded_stat = saved
@@ -0,0 +1,43 @@
+"""Tests for the context module."""
+
+from jarbas import context
+
+
+def _conversation(turns, size=400):
+    messages = [{"role": "system", "content": "You are a helpful assistant."}]
+    for i in range(turns):
+        messages.append({"role": "user", "content": f"question {i} " + "x" * size})
+        messages.append({"role": "assistant", "content": "", "tool_calls": [
+            {"function": {"name": "slack.slack_get_users", "arguments": {}}, "id": "call_0", "type": "function"}
+        ]})
+        messages.append({"role": "tool", "content": "y" * size})
+        messages.append({"role": "assistant", "content": f"answer {i}"})
+    return messages
+
+
+def test_fit_leaves_small_conversations_untouched():
+    messages = _conversation(2)
+    assert context.fit(messages, 10000) is messages
+
+
+def test_fit_drops_oldest_turns_and_keeps_current_turn():
+    messages = _conversation(10)
+    fitted = context.fit(messages, 1000)
+
+    assert sum(context.count_tokens(m) for m in fitted) <= 1000
+    assert fitted[0] == messages[0], "System prompt should be kept"
+    assert fitted[1]["role"] == "system" and "omitted" in fitted[1]["content"], \
+        "Dropped turns should be summarized"
+    assert fitted[-4:] == messages[-4:], "Current turn should be kept intact"
+
+
+def test_fit_accounts_for_tool_schemas():
+    messages = _conversation(3)
+    tools = [{"type": "function", "function": {"name": "t", "description": "d" * 2000}}]
+    assert context.fit(messages, 1000) is messages
+    assert len(context.fit(messages, 1000, tools)) < len(messages)
+
+
+def test_fit_keeps_system_only_conversations():
+    messages = [{"role": "system", "content": "x" * 4000}]
+    assert context.fit(messages, 100) is messages
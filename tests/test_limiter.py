@@ -0,0 +1,56 @@
+"""Tests for the limiter module."""
+
+import asyncio
+import threading
+import time
+import pytest
+from jarbas import limiter
+
+
+def test_waiters_are_admitted_in_fifo_order():
+    gate = limiter.Limiter("test", max_in_flight=1)
+    gate.acquire()
+    admitted = []
+
+    def worker(i):
+        gate.acquire()
+        admitted.append(i)
+        gate.release()
+
+    threads = []
+    for i in range(4):
+        threads.append(threading.Thread(target=worker, args=(i,)))
+        threads[-1].start()
+        while gate.stats()["queued"] <= i:
+            time.sleep(0.001)
+    gate.release()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert admitted == [0, 1, 2, 3]
+    assert gate.stats()["in_flight"] == 0
+
+
+def test_full_queue_rejects():
+    gate = limiter.Limiter("test", max_in_flight=1, max_queued=0)
+    gate.acquire()
+    with pytest.raises(limiter.QueueFullError):
+        gate.acquire()
+    assert gate.stats()["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_gives_up_its_place():
+    gate = limiter.Limiter("test", max_in_flight=1)
+    await gate.aacquire()
+    cancelled = asyncio.create_task(gate.aacquire())
+    waiting = asyncio.create_task(gate.aacquire())
+    await asyncio.sleep(0.01)
+    cancelled.cancel()
+    await asyncio.sleep(0.01)
+
+    gate.release()
+    assert await asyncio.wait_for(waiting, 1) >= 0, "Next waiter should get the slot"
+    gate.release()
+    stats = gate.stats()
+    assert stats["in_flight"] == 0 and stats["queued"] == 0
@@ -3,6 +3,7 @@
 import pytest
 import asyncio
 import json
+from unittest.mock import patch
 from jarbas import llms, tools, configs
 
 
@@ -127,3 +128,126 @@ def test_chat_with_multiple_turns_using_tools():
     response = llms.chat(provider=provider, model=model, messages=messages, tools=_tools)
     
     assert response, "No response was returned"
+
+
+def test_chat_streaming():
+    messages = [{"role": "user", "content": "Hello, what is your name?"}]
+    provider, model = configs.get_default_model().split("/")
+    events = list(llms.chat(provider=provider, model=model, messages=messages, stream=True))
+
+    assert events, "No events were streamed"
+    event_type, response = events[-1]
+    assert event_type == "message", "Last event should be the assembled message"
+    assert response.get("role") == "assistant", "Response role should be 'assistant'"
+    tokens = [data["content"] for event_type, data in events[:-1] if event_type == "token"]
+    assert len(tokens) > 1, "Response should arrive in several tokens"
+    assert "".join(tokens) == response["content"], "Tokens should add up to the final content"
+
+
+def test_client_is_reused_across_calls():
+    messages = [{"role": "user", "content": "Hello, what is your name?"}]
+    provider, model = configs.get_default_model().split("/")
+    llms.chat(provider=provider, model=model, messages=messages)
+    client = llms.get_client(configs.get_llm_provider(provider))
+    llms.chat(provider=provider, model=model, messages=messages)
+
+    assert llms.get_client(configs.get_llm_provider(provider)) is client, "Client should be pooled per provider"
+
+
+def test_chat_uses_response_cache(tmp_path):
+    messages = [{"role": "user", "content": "Hello, what is your name?"}]
+    provider, model = configs.get_default_model().split("/")
+    settings = {"enabled": True, "path": str(tmp_path / "llm_cache.sqlite")}
+
+    with patch("jarbas.configs.get_llm_cache_settings", return_value=settings), \
+         patch("jarbas.llms._response_cache", None):
+        first = llms.chat(provider=provider, model=model, messages=messages)
+        with patch("jarbas.llms._chat_ollama") as chat_ollama:
+            second = llms.chat(provider=provider, model=model, messages=messages)
+            chat_ollama.assert_not_called()
+            llms.chat(provider=provider, model=model, messages=messages, bypass_cache=True)
+            chat_ollama.assert_called_once()
+
+    assert second == first, "Identical request should be answered from the cache"
+
+
+def test_ollama_pool_ejects_failing_backend():
+    messages = [{"role": "user", "content": "Hello, what is your name?"}]
+    _, model = configs.get_default_model().split("/")
+    live_url = configs.get_llm_provider("ollama-local")["url"]
+    pool = {
+        "name": "ollama-pool-test",
+        "type": "ollama-pool",
+        "timeout": 5,
+        "eject_after_failures": 1,
+        "backends": [{"url": "http://127.0.0.1:9"}, {"url": live_url}],
+    }
+
+    with patch("jarbas.configs.get_llm_provider", return_value=pool):
+        replies = [llms.chat("ollama-pool-test", model, messages) for _ in range(3)]
+
+    assert sum("I encountered an error" in r["content"] for r in replies) == 1, \
+        "Only the first request should hit the dead backend"
+    dead, live = llms.balancer.stats(pool)
+    assert not dead["healthy"] and dead["outstanding"] == 0
+    assert live["healthy"] and model in live["models"]
+
+
+@pytest.mark.asyncio
+async def test_provider_limit_rejects_when_queue_is_full():
+    messages = [{"role": "user", "content": "Hello, what is your name?"}]
+    provider, model = configs.get_default_model().split("/")
+    limited = {**configs.get_llm_provider(provider), "max_in_flight": 1, "max_queued": 1}
+
+    with patch("jarbas.configs.get_llm_provider", return_value=limited):
+        replies = await asyncio.gather(
+            *(llms.achat(provider, model, messages, bypass_cache=True) for _ in range(3)),
+            return_exceptions=True,
+        )
+
+    rejected = [r for r in replies if isinstance(r, llms.limiter.QueueFullError)]
+    assert len(rejected) == 1, "Only the request beyond the queue should be rejected"
+    assert all(r["role"] == "assistant" for r in replies if r not in rejected)
+
+
+@pytest.mark.asyncio
+async def test_preload_marks_pool_backends_loaded():
+    live_url = configs.get_llm_provider("ollama-local")["url"]
+    pool = {
+        "name": "ollama-preload-test",
+        "type": "ollama-pool",
+        "keep_alive": "30m",
+        "backends": [{"url": live_url}, {"url": live_url.replace("localhost", "127.0.0.1")}],
+    }
+
+    with patch("jarbas.configs.get_llm_provider", return_value=pool):
+        await llms.apreload("ollama-preload-test", "qwen2.5")
+
+    assert all("qwen2.5" in backend["models"] for backend in llms.balancer.stats(pool))
+
+
+def test_config_change_closes_stale_clients():
+    provider, _ = configs.get_default_model().split("/")
+    client = llms.get_client(configs.get_llm_provider(provider))
+
+    changes = configs.diff({}, {})
+    changes["llm_providers"]["changed"] = [provider]
+    llms._on_config_change(changes)
+
+    assert client._client.is_closed, "A stale client's connections should be closed"
+    assert llms.get_client(configs.get_llm_provider(provider)) is not client
+
+
+@pytest.mark.asyncio
+async def test_backend_failure_releases_limiter_slot():
+    messages = [{"role": "user", "content": "Hello"}]
+    broken = {"name": "broken-pool", "type": "ollama-pool", "backends": [], "max_in_flight": 1}
+
+    with patch("jarbas.configs.get_llm_provider", return_value=broken):
+        for _ in range(3):
+            reply = await asyncio.wait_for(
+                llms.achat("broken-pool", "m", messages, bypass_cache=True), 5
+            )
+            assert reply["role"] == "assistant", "A pool without backends should answer with an error"
+
+    assert llms.limiter.get_limiter(broken, "m").in_flight == 0, "The slot should be released"
@@ -0,0 +1,57 @@
+"""Tests for the HTTP chat API."""
+
+import json
+import pytest
+from starlette.testclient import TestClient
+from jarbas import main_api
+
+
+@pytest.fixture
+def client():
+    with TestClient(main_api.app) as client:
+        yield client
+
+
+def test_start_and_continue_chat(client):
+    response = client.post("/chats", json={"agent": "unhelpful", "message": "hello"})
+    assert response.status_code == 200
+    chat = response.json()
+    assert chat["agent"] == "unhelpful"
+    assert chat["messages"][-1]["role"] == "assistant"
+
+    response = client.post(f"/chats/{chat['chat_id']}/messages", json={"message": "again"})
+    assert response.status_code == 200
+    user_messages = [m["content"] for m in response.json()["messages"] if m["role"] == "user"]
+    assert user_messages == ["hello", "again"], "Second message should continue the chat"
+
+    assert client.get(f"/chats/{chat['chat_id']}").json()["messages"] == response.json()["messages"]
+    assert client.delete(f"/chats/{chat['chat_id']}").status_code == 200
+    assert client.get(f"/chats/{chat['chat_id']}").status_code == 404
+
+
+def test_streamed_chat_sends_tool_events(client):
+    events = []
+    with client.stream(
+        "POST", "/chats", json={"message": "list 10 slack user names", "stream": True}
+    ) as response:
+        assert response.status_code == 200
+        for line in response.iter_lines():
+            if line.startswith("event:"):
+                events.append(line.split(":", 1)[1].strip())
+            elif line.startswith("data:"):
+                data = line.split(":", 1)[1].strip()
+
+    assert "tool_call" in events and "tool_result" in events
+    assert events[-1] == "done"
+    assert json.loads(data)["messages"][-1]["role"] == "assistant"
+
+
+def test_invalid_requests(client):
+    sessions = main_api._get_sessions().stats()["entries"]
+    assert client.post("/chats", json={"agent": "nobody", "message": "hi"}).status_code == 400
+    assert client.post("/chats", json={"text": "hi"}).status_code == 400
+    response = client.post("/chats", json={"message": "hi", "provider": "nope", "model": "x"})
+    assert response.status_code == 400
+    assert main_api._get_sessions().stats()["entries"] == sessions, \
+        "Rejected chats should not be kept"
+    assert client.post("/chats/missing/messages", json={"message": "hi"}).status_code == 404
@@ -0,0 +1,54 @@
+"""Tests for the metrics module."""
+
+import asyncio
+import pytest
+from jarbas import metrics
+
+
+@pytest.fixture(autouse=True)
+def _reset_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_spans_nest_and_feed_histograms():
+    with metrics.span("chat.turn") as turn:
+        with metrics.span("llm.response", model="m"):
+            pass
+        with metrics.span("tools.call", tool="slack.x"):
+            metrics.add_span("mcp.connect", 0.02)
+
+    tree = turn.to_dict()
+    assert [c["name"] for c in tree["children"]] == ["llm.response", "tools.call"]
+    assert tree["children"][1]["children"][0]["name"] == "mcp.connect"
+    assert tree["children"][0]["attributes"] == {"model": "m"}
+    histograms = metrics.export_json()["histograms"]
+    assert set(histograms) == {"chat.turn", "llm.response", "tools.call", "mcp.connect"}
+    assert histograms["mcp.connect"]["buckets"]["0.01"] == 0
+    assert histograms["mcp.connect"]["buckets"]["0.025"] == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_tasks_attach_to_the_enclosing_span():
+    async def call(i):
+        with metrics.span("tools.call", index=i):
+            await asyncio.sleep(0.01)
+
+    with metrics.span("chat.turn") as turn:
+        await asyncio.gather(*(call(i) for i in range(3)))
+
+    assert len(turn.children) == 3
+    assert all(not child.children for child in turn.children), \
+        "Sibling tasks should not nest inside each other"
+
+
+def test_export_prometheus():
+    metrics.observe("llm.response", 0.2)
+    metrics.observe("llm.response", 3)
+    text = metrics.export_prometheus()
+
+    assert "# TYPE jarbas_span_duration_seconds histogram" in text
+    assert 'jarbas_span_duration_seconds_bucket{span="llm.response",le="0.25"} 1' in text
+    assert 'jarbas_span_duration_seconds_bucket{span="llm.response",le="+Inf"} 2' in text
+    assert 'jarbas_span_duration_seconds_count{span="llm.response"} 2' in text
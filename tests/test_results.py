@@ -0,0 +1,85 @@
+"""Tests for the results module."""
+
+import json
+import pytest
+from unittest.mock import patch
+from jarbas import results
+
+
+@pytest.fixture
+def settings(tmp_path):
+    settings = {
+        "max_chars": 100,
+        "limits": [{"pattern": "youtube.*", "max_chars": 1000}],
+        "store_dir": str(tmp_path),
+    }
+    with patch("jarbas.configs.get_tool_results_settings", return_value=settings), \
+         patch("jarbas.results._stored", None):
+        yield settings
+
+
+def test_compact_keeps_small_results(settings):
+    result = {"ok": True}
+    assert results.compact("slack.slack_get_users", result) == (result, None)
+
+
+def test_compact_truncates_and_stores_large_results(settings):
+    result = {"members": ["user"] * 100}
+    compacted, handle = results.compact("slack.slack_get_users", result)
+
+    assert handle.startswith(results.HANDLE_PREFIX)
+    assert compacted["truncated"] is True
+    assert len(compacted["content"]) == 100
+    assert results.load(handle) == json.dumps(result), "Full payload should be stored"
+
+
+def test_compact_uses_per_tool_limits(settings):
+    result = "x" * 500
+    assert results.compact("youtube.get_transcript", result) == (result, None)
+
+
+def test_read_pages_through_stored_result(settings):
+    text = "".join(str(i % 10) for i in range(250))
+    _, handle = results.compact("slack.slack_get_history", text)
+    page = results.read(handle, offset=200, limit=100)
+
+    assert page["content"] == text[200:]
+    assert page["truncated"] is False
+
+
+def test_load_falls_back_to_disk(settings):
+    _, handle = results.compact("slack.slack_get_history", "y" * 500)
+    results._get_store().clear()
+    assert results.load(handle) == "y" * 500
+
+
+def test_read_rejects_bad_arguments(settings):
+    _, handle = results.compact("slack.slack_get_history", "z" * 500)
+
+    assert results.read(None)["type"] == "error"
+    assert results.read(handle, offset=-1)["type"] == "error"
+    assert results.read(handle, offset="abc")["type"] == "error"
+    assert results.read(handle, offset=None)["offset"] == 0
+    assert results.read(handle, offset="100", limit=50.0)["content"] == "z" * 50
+
+
+def test_store_dir_is_capped(settings, tmp_path):
+    settings["max_stored"] = 3
+    handles = [results.compact("slack.slack_get_history", str(i) * 500)[1] for i in range(5)]
+    files = sorted(p.name for p in tmp_path.iterdir())
+
+    assert len(files) == 3, "Only the newest max_stored results should stay on disk"
+    assert f"{handles[-1]}.json" in files
+
+
+def test_read_caps_limit_at_tool_max_chars(settings):
+    _, handle = results.compact("slack.slack_get_history", "a" * 1000)
+    assert len(results.read(handle, limit=10**9)["content"]) == 100, \
+        "A page should never be larger than compact allows"
+
+    _, handle = results.compact("youtube.get_transcript", "b" * 5000)
+    assert len(results.read(handle)["content"]) == 1000, "Per-tool limits should set the page size"
+
+    results._get_store().clear()
+    assert len(results.read(handle, limit=10**9)["content"]) == 100, \
+        "Payloads reloaded from disk should use the global max_chars"
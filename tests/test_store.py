@@ -0,0 +1,48 @@
+"""Tests for the store module."""
+
+import pytest
+from jarbas import store
+
+
+def _turn(i):
+    return [
+        {"role": "user", "content": f"question {i}"},
+        {"role": "assistant", "content": f"answer {i}"},
+    ]
+
+
+def test_append_and_load(tmp_path):
+    conversations = store.SqliteStore(str(tmp_path / "conversations.sqlite"))
+    conversation_id = conversations.create("helpful", "ollama-local", "qwen2.5")
+    conversations.append(conversation_id, [{"role": "system", "content": "be nice"}] + _turn(0))
+    for i in range(1, 5):
+        conversations.append(conversation_id, _turn(i))
+
+    messages = conversations.load(conversation_id)
+    assert len(messages) == 11
+    assert messages[-1] == {"role": "assistant", "content": "answer 4"}
+
+    recent = conversations.load(conversation_id, limit=4)
+    assert [m["content"] for m in recent] == [
+        "be nice", "question 3", "answer 3", "question 4", "answer 4"
+    ], "limit should keep the system prompt and the most recent messages"
+
+    conversation = conversations.get(conversation_id)
+    assert conversation["title"] == "question 0"
+    assert conversation["message_count"] == 11
+    assert [c["id"] for c in conversations.list()] == [conversation_id]
+
+
+def test_unknown_conversation(tmp_path):
+    conversations = store.SqliteStore(str(tmp_path / "conversations.sqlite"))
+    assert conversations.load("missing") is None
+    assert conversations.get("missing") is None
+
+
+def test_partial_store_fails_on_creation():
+    class AppendOnly(store.ConversationStore):
+        def append(self, conversation_id, messages):
+            pass
+
+    with pytest.raises(TypeError):
+        AppendOnly()
@@ -1,7 +1,11 @@
 """Integration tests for the tooledchat module."""
 
+import asyncio
 import json
-from jarbas import tooledchat
+import pytest
+import time
+from unittest.mock import patch
+from jarbas import metrics, results, store, tooledchat
 
 def test_slack_users():
     tooledchat.init()
@@ -67,4 +71,193 @@ def test_youtube():
     query = "summarize this video: https://www.youtube.com/watch?v=-qjE8JkIVoQ"
     messages = tooledchat.start_chat("helpful", query)
     assert any([t in messages[-1]["content"].lower() for t in ["lynx", "framework", "javascript", "tiktok"]]), "response should be about Lynx"
-    
\ No newline at end of file
+    
+
+def test_call_tools_runs_concurrently_in_order():
+    async def fake_call_tool(name, arguments, on_progress=None):
+        await asyncio.sleep(arguments["delay"])
+        return {"type": "text", "text": name}
+
+    tool_calls = [
+        {"id": f"call_{i}", "type": "function",
+         "function": {"name": f"slack.tool_{i}", "arguments": {"delay": delay}}}
+        for i, delay in enumerate([0.3, 0.1, 0.2])
+    ]
+    events = []
+    with patch("jarbas.tools.call_tool", fake_call_tool):
+        start = time.monotonic()
+        results = tooledchat._call_tools(tool_calls, cb=lambda t, d: events.append((t, d["id"])))
+        elapsed = time.monotonic() - start
+
+    assert elapsed < 0.5, f"Tool calls should overlap, took {elapsed:.2f}s"
+    assert [r["result"]["text"] for r in results] == ["slack.tool_0", "slack.tool_1", "slack.tool_2"]
+    assert [e for e in events if e[0] == "tool_result"] == [
+        ("tool_result", "call_1"), ("tool_result", "call_2"), ("tool_result", "call_0")
+    ]
+
+
+def test_call_tools_relays_tool_progress():
+    async def fake_call_tool(name, arguments, on_progress=None):
+        for step in range(3):
+            on_progress({"progress": step, "total": 3})
+            await asyncio.sleep(0)
+        return {"type": "text", "text": "done"}
+
+    tool_calls = [{"id": "call_0", "type": "function",
+                   "function": {"name": "slack.slow", "arguments": {}}}]
+    events = []
+    with patch("jarbas.tools.call_tool", fake_call_tool):
+        tooledchat._call_tools(tool_calls, cb=lambda t, d: events.append((t, d)))
+
+    assert [t for t, _ in events] == [
+        "tool_call", "tool_progress", "tool_progress", "tool_progress", "tool_result"
+    ]
+    progress = [d for t, d in events if t == "tool_progress"]
+    assert [(d["id"], d["tool"], d["progress"], d["total"]) for d in progress] == [
+        ("call_0", "slack.slow", step, 3) for step in range(3)
+    ]
+
+
+def test_read_result_with_bad_arguments_returns_error():
+    tool_calls = [
+        {"id": f"call_{i}", "type": "function",
+         "function": {"name": results.READ_RESULT_TOOL_NAME, "arguments": arguments}}
+        for i, arguments in enumerate([{}, {"handle": "res_x", "offset": None}, "not json"])
+    ]
+    responses = tooledchat._call_tools(tool_calls)
+
+    assert [r["result"]["type"] for r in responses] == ["error"] * 3
+
+
+def test_has_stored_results_looks_for_truncated_pages():
+    def tool_message(result):
+        return {"role": "tool", "content": json.dumps([{"tool": "t", "result": result}])}
+
+    assert not tooledchat._has_stored_results([tool_message({"features_": "res_abc"})])
+    assert tooledchat._has_stored_results(
+        [tool_message({"truncated": True, "handle": "res_abc", "content": "..."})]
+    )
+
+
+@pytest.mark.asyncio
+async def test_astart_chat():
+    await tooledchat.ainit()
+    callback_events = []
+
+    messages = await tooledchat.astart_chat(
+        "helpful", "list 10 slack user names",
+        cb=lambda event_type, event_data: callback_events.append(event_type),
+    )
+
+    assert messages[-1]["role"] == "assistant", "Last message should be assistant message"
+    assert any("tool_calls" in m for m in messages), "Assistant should make a tool call"
+    assert "tool_call" in callback_events and "tool_result" in callback_events
+    phases = [child["name"] for child in metrics.export_json()["last_turn"]["children"]]
+    assert phases.count("llm.response") == 2, "Both model calls should be timed"
+    assert "tools.call" in phases and "tools.serialize" in phases
+
+
+def test_agent_without_tools_skips_discovery():
+    tooledchat.init()
+    tooledchat.set_agent("unhelpful")
+    try:
+        with patch("jarbas.tools.ensure_tools") as ensure_tools:
+            messages = tooledchat.start_chat("unhelpful", "hello")
+    finally:
+        tooledchat.set_agent("helpful")
+
+    ensure_tools.assert_not_called()
+    assert messages[-1]["role"] == "assistant"
+
+
+@pytest.mark.asyncio
+async def test_chat_sessions_keep_their_own_agent_and_history():
+    helpful = tooledchat.ChatSession("helpful")
+    unhelpful = tooledchat.ChatSession("unhelpful")
+
+    helpful_messages, unhelpful_messages = await asyncio.gather(
+        helpful.asend("list 10 slack user names"),
+        unhelpful.asend("list 10 slack user names"),
+    )
+
+    assert any("tool_calls" in m for m in helpful_messages), "helpful agent should use tools"
+    assert not any("tool_calls" in m for m in unhelpful_messages), "unhelpful agent has no tools"
+    assert helpful.messages is helpful_messages
+
+    await unhelpful.asend("thanks")
+    assert [m["content"] for m in unhelpful.messages if m["role"] == "user"] == [
+        "list 10 slack user names", "thanks"
+    ], "send should continue the session's own history"
+    assert unhelpful.last_turn.name == "chat.turn"
+
+
+def test_chat_session_rejects_unknown_agent():
+    session = tooledchat.ChatSession()
+    with pytest.raises(ValueError):
+        session.set_agent("nobody")
+
+
+def test_chat_session_stores_messages_and_resumes(tmp_path):
+    conversations = store.SqliteStore(str(tmp_path / "conversations.sqlite"))
+    session = tooledchat.ChatSession("unhelpful", conversation_store=conversations)
+
+    with patch("jarbas.store.get_window", return_value=4):
+        for text in ["one", "two", "three"]:
+            session.send(text)
+        session.messages.append({"role": "user", "content": "four"})
+        session.chat(session.messages)
+
+        stored = conversations.load(session.conversation_id)
+        assert [m["content"] for m in stored if m["role"] == "user"] == ["one", "two", "three", "four"], \
+            "Every message should be stored once, in order"
+        assert len(stored) == 9
+        assert [m["role"] for m in session.messages] == ["system", "user", "assistant", "user", "assistant"], \
+            "Only the system prompt and the most recent turns should stay in memory"
+
+        resumed = tooledchat.ChatSession.resume(session.conversation_id, conversations)
+        assert resumed.agent == "unhelpful"
+        assert resumed.messages == session.messages
+        resumed.send("five")
+    assert conversations.get(session.conversation_id)["message_count"] == 11
+
+
+@pytest.mark.asyncio
+async def test_warm_up_preloads_configured_models():
+    agents = tooledchat.configs.get_agents() + [
+        {"name": "pinned", "system_content": "hi", "model": "ollama-local/llama3.2"}
+    ]
+    with patch("jarbas.configs._config", dict(tooledchat.configs._config, agents=agents)), \
+         patch("jarbas.llms.apreload") as apreload:
+        await tooledchat.warm_up()
+        session = tooledchat.ChatSession("pinned")
+        pinned = (session.provider, session.model)
+        session.set_agent("unhelpful")
+
+    preloaded = sorted(call.args for call in apreload.call_args_list)
+    assert preloaded == [("ollama-local", "llama3.2"), ("ollama-local", "qwen2.5")]
+    assert pinned == ("ollama-local", "llama3.2"), \
+        "An agent's own model should override default_model"
+    assert (session.provider, session.model) == ("ollama-local", "qwen2.5"), \
+        "Switching to an agent without a model should go back to default_model"
+
+
+def test_set_agent_keeps_the_users_model():
+    session = tooledchat.ChatSession("helpful")
+    session.set_provider_and_model("ollama-local", "llama3.2")
+    session.set_agent("unhelpful")
+    assert (session.provider, session.model) == ("ollama-local", "llama3.2"), \
+        "A model picked by the user should survive switching between unpinned agents"
+
+
+@pytest.mark.asyncio
+async def test_ainit_warms_up_in_the_background():
+    async def slow_warm_up():
+        await asyncio.sleep(1)
+
+    with patch("jarbas.tooledchat.warm_up", slow_warm_up):
+        start = time.monotonic()
+        await tooledchat.ainit()
+        elapsed = time.monotonic() - start
+        tooledchat.stop_keep_warm()
+
+    assert elapsed < 0.5, f"Startup should not wait for model loads, took {elapsed:.2f}s"
@@ -2,8 +2,12 @@
 
 import pytest
 import asyncio
+import json
+from benchmarks import fakes
+from sse_starlette import sse
 from jarbas import tools, configs
 import fnmatch
+from unittest.mock import patch
 
 
 @pytest.fixture(scope="module", autouse=True)
@@ -75,4 +79,283 @@ async def test_call_tool():
     
     if isinstance(result, dict) and result.get("type") == "error":
         assert "code" in result, "Error response missing code"
-        assert "message" in result, "Error response missing message" 
\ No newline at end of file
+        assert "message" in result, "Error response missing message" 
+
+@pytest.mark.asyncio
+async def test_call_tool_reuses_pooled_session():
+    if not tools.tools:
+        await tools.init()
+
+    await tools.call_tool("slack.slack_get_users", {"limit": 1})
+    pooled = tools._sessions["slack"]
+    await tools.call_tool("slack.slack_get_users", {"limit": 1})
+    assert tools._sessions["slack"] is pooled, "Session should be reused across calls"
+    assert pooled.alive, "Pooled session should stay open between calls"
+
+    await tools.close_sessions()
+    assert not tools._sessions, "close_sessions should empty the pool"
+
+
+@pytest.mark.asyncio
+async def test_init_skips_unreachable_server():
+    tools.tools = {}
+    servers = configs.get_mcp_servers() + [
+        {"name": "dead", "url": "http://127.0.0.1:9/sse", "discovery_timeout": 2}
+    ]
+    with patch("jarbas.configs.get_mcp_servers", return_value=servers), \
+         patch("jarbas.configs.get_tool_catalog_cache_settings", return_value={}):
+        await tools.init()
+
+    assert tools.tools, "Reachable servers should still be loaded"
+    assert tools.discovery_report["dead"]["status"] in ("error", "timeout")
+    assert not any(name.startswith("dead.") for name in tools.tools)
+    for server in servers[:-1]:
+        assert tools.discovery_report[server["name"]]["status"] == "ok"
+
+
+@pytest.mark.asyncio
+async def test_call_tool_serves_cacheable_results_from_cache():
+    if not tools.tools:
+        await tools.init()
+    tools.clear_cache()
+    rules = {"rules": [{"pattern": "slack.slack_get_users", "ttl": 60}]}
+
+    with patch("jarbas.configs.get_tool_cache_settings", return_value=rules):
+        first = await tools.call_tool("slack.slack_get_users", {"limit": 2})
+        hits = tools.cache_stats()["hits"]
+        with patch("jarbas.tools._call_tool_uncached") as uncached:
+            second = await tools.call_tool("slack.slack_get_users", {"limit": 2})
+            uncached.assert_not_called()
+
+    assert second == first, "Cached result should match the original"
+    assert tools.cache_stats()["hits"] == hits + 1
+
+
+@pytest.mark.asyncio
+async def test_get_tools_deduplicates_and_reuses_resolution():
+    if not tools.tools:
+        await tools.init()
+
+    overlapping = tools.get_tools("slack.*", "slack.slack_get_users", "slack.slack_*")
+    names = [tool["function"]["name"] for tool in overlapping]
+    assert len(names) == len(set(names)), "Overlapping patterns should not duplicate tools"
+    assert set(names) == {name for name in tools.tools if name.startswith("slack.")}
+
+    assert tools.get_tools("slack.*", "youtube.*") is tools.get_tools("slack.*", "youtube.*"), \
+        "Resolved patterns should be reused until the catalog changes"
+
+
+@pytest.mark.asyncio
+async def test_init_loads_catalog_from_disk_cache(tmp_path):
+    settings = {"path": str(tmp_path / "tools.json"), "ttl": 3600}
+    with patch("jarbas.configs.get_tool_catalog_cache_settings", return_value=settings), \
+         patch("jarbas.tools._catalog_cache", None):
+        tools.tools = {}
+        await tools.init()
+        discovered = dict(tools.tools)
+
+    with patch("jarbas.configs.get_tool_catalog_cache_settings", return_value=settings), \
+         patch("jarbas.tools._catalog_cache", None), \
+         patch("jarbas.tools._load_tools") as load_tools:
+        tools.tools = {}
+        await tools.init()
+        load_tools.assert_not_called()
+
+    assert tools.tools == discovered, "Cached catalog should match the live one"
+    for server in configs.get_mcp_servers():
+        assert tools.discovery_report[server["name"]]["status"] == "cached"
+
+
+@pytest.mark.asyncio
+async def test_ensure_tools_loads_only_matching_servers():
+    tools.tools = {}
+    with patch("jarbas.configs.get_tool_catalog_cache_settings", return_value={}):
+        await tools.ensure_tools("slack.*")
+
+    assert any(name.startswith("slack.") for name in tools.tools), "slack tools should be loaded"
+    assert not any(name.startswith("youtube.") for name in tools.tools), \
+        "Servers not matched by the patterns should not be contacted"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_session():
+    if not tools.tools:
+        await tools.init()
+
+    with patch("jarbas.configs.get_tool_cache_settings", return_value={}):
+        results = await asyncio.gather(
+            *(tools.call_tool("slack.slack_get_users", {"limit": n}) for n in range(1, 6))
+        )
+    pooled = tools._sessions["slack"]
+    assert all(r is not None for r in results), "Every concurrent call should get its result"
+    assert not pooled.session._response_streams, "No response streams should be left behind"
+
+    await tools.close_sessions()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_call_leaves_session_usable():
+    if not tools.tools:
+        await tools.init()
+
+    with patch("jarbas.configs.get_tool_cache_settings", return_value={}):
+        await tools.call_tool("slack.slack_get_users", {"limit": 1})
+        pooled = tools._sessions["slack"]
+        task = asyncio.create_task(tools.call_tool("slack.slack_get_users", {"limit": 2}))
+        while not pooled.session._response_streams:
+            await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        result = await tools.call_tool("slack.slack_get_users", {"limit": 1})
+    assert result is not None, "Calls after a cancelled one should still work"
+    assert tools._sessions["slack"] is pooled, "Cancelling should not drop the session"
+
+    await tools.close_sessions()
+
+
+@pytest.mark.asyncio
+async def test_call_tool_with_progress_callback():
+    port = fakes.free_port()
+    # sse_starlette keeps one exit event per process, bound to the first loop
+    # that served SSE (the API tests'); the fake server runs on its own loop
+    sse.AppStatus.should_exit_event = None
+    fakes.serve(fakes.fake_mcp_app(latency=0.3, progress_steps=3), port)
+    server = {"name": "progress", "url": f"http://127.0.0.1:{port}/sse"}
+    config = dict(configs._config, mcp_serrvers=configs.get_mcp_servers() + [server])
+
+    updates = []
+    with patch("jarbas.configs._config", config), \
+         patch("jarbas.configs.get_tool_catalog_cache_settings", return_value={}), \
+         patch("jarbas.configs.get_tool_cache_settings", return_value={}):
+        await tools.ensure_tools("progress.*")
+        result = await tools.call_tool(
+            f"progress.{fakes.FAKE_TOOL_NAME}", {"limit": 2}, on_progress=updates.append
+        )
+        assert not tools._sessions["progress"].progress_handlers, \
+            "The progress callback should be dropped once the call finishes"
+        await tools.close_sessions()
+        tools._drop_servers(["progress"])
+
+    assert json.loads(result["text"])["ok"] is True
+    assert updates == [{"progress": step, "total": 3} for step in (1, 2, 3)], \
+        "Every progress notification should reach the callback, in order"
+
+
+@pytest.mark.asyncio
+async def test_config_change_drops_only_affected_servers():
+    with patch("jarbas.configs.get_tool_catalog_cache_settings", return_value={}):
+        tools.tools = {}
+        await tools.ensure_tools("slack.*", "youtube.*")
+        await tools.call_tool("slack.slack_get_users", {"limit": 1})
+        youtube_tools = {n: t for n, t in tools.tools.items() if n.startswith("youtube.")}
+
+        changes = configs.diff({}, {})
+        changes["mcp_servers"]["changed"] = ["slack"]
+        tools._on_config_change(changes)
+        await asyncio.sleep(0.1)
+
+        assert not any(name.startswith("slack.") for name in tools.tools), \
+            "Tools of a changed server should be dropped"
+        assert "slack" not in tools._sessions, "The changed server's session should be closed"
+        assert {n: t for n, t in tools.tools.items() if n.startswith("youtube.")} == youtube_tools, \
+            "Other servers should keep their tools"
+
+        await tools.ensure_tools("slack.*")
+        assert any(name.startswith("slack.") for name in tools.tools), \
+            "The changed server should be rediscovered on next use"
+
+    await tools.close_sessions()
+
+
+def test_config_change_after_pool_loop_closed():
+    async def load():
+        tools.tools = {}
+        await tools.ensure_tools("slack.*", "youtube.*")
+
+    with patch("jarbas.configs.get_tool_catalog_cache_settings", return_value={}):
+        asyncio.run(load())
+    assert {"slack", "youtube"} <= set(tools._sessions)
+    version = tools._catalog_version
+
+    changes = configs.diff({}, {})
+    changes["mcp_servers"]["removed"] = ["slack", "youtube"]
+    changes["settings"] = ["tool_cache"]
+    tools._get_result_cache()
+    tools._on_config_change(changes)
+
+    assert not tools.tools, "Tools of every removed server should be dropped"
+    assert not tools._sessions, "Sessions of a closed loop should just be forgotten"
+    assert tools._catalog_version == version + 1
+    assert tools._result_cache is None, "The result cache should be rebuilt from new settings"
+
+
+@pytest.mark.asyncio
+async def test_call_tool_is_not_retried_once_sent():
+    if not tools.tools:
+        await tools.init()
+
+    with patch("jarbas.configs.get_tool_cache_settings", return_value={}):
+        await tools.call_tool("slack.slack_get_users", {"limit": 1})
+        pooled = tools._sessions["slack"]
+        with patch("jarbas.tools._acquire_session", wraps=tools._acquire_session) as acquire:
+            task = asyncio.create_task(tools.call_tool("slack.slack_get_users", {"limit": 2}))
+            while not pooled.session._response_streams:
+                await asyncio.sleep(0)
+            await pooled.close()
+            result = await task
+
+    assert result["type"] == "error", "A call dropped mid-flight should come back as an error"
+    assert acquire.call_count == 1, "A call already sent must not be retried"
+    await tools.close_sessions()
+
+
+@pytest.mark.asyncio
+async def test_call_tool_retries_when_not_yet_sent():
+    if not tools.tools:
+        await tools.init()
+
+    with patch("jarbas.configs.get_tool_cache_settings", return_value={}):
+        await tools.call_tool("slack.slack_get_users", {"limit": 1})
+        pooled = tools._sessions["slack"]
+        await pooled.write.aclose()
+        result = await tools.call_tool("slack.slack_get_users", {"limit": 3})
+
+    assert not (isinstance(result, dict) and result.get("type") == "error"), \
+        "A connection found dead before sending should be reopened transparently"
+    assert tools._sessions["slack"] is not pooled
+    await tools.close_sessions()
+
+
+@pytest.mark.asyncio
+async def test_request_on_dropped_session_raises_connection_error():
+    if not tools.tools:
+        await tools.init()
+    await tools.call_tool("slack.slack_get_users", {"limit": 1})
+    pooled = tools._sessions["slack"]
+
+    session, pooled.session = pooled.session, None
+    try:
+        with pytest.raises(ConnectionError):
+            await tools._send_request(pooled, "ping")
+    finally:
+        pooled.session = session
+    await tools.close_sessions()
+
+
+@pytest.mark.asyncio
+async def test_idle_sessions_are_closed_without_further_calls():
+    if not tools.tools:
+        await tools.init()
+    settings = {"idle_timeout": 0.2, "health_check_interval": 0.2}
+
+    with patch("jarbas.configs.get_mcp_pool_settings", return_value=settings), \
+         patch("jarbas.configs.get_tool_cache_settings", return_value={}):
+        await tools.close_sessions()
+        await tools.call_tool("slack.slack_get_users", {"limit": 1})
+        pooled = tools._sessions["slack"]
+        await asyncio.sleep(0.8)
+
+    assert "slack" not in tools._sessions, "An idle session should be closed on its own"
+    assert not pooled.alive
@@ -0,0 +1,59 @@
+"""Tests for the toolselect module."""
+
+import asyncio
+from unittest.mock import patch
+from jarbas import limiter, toolselect
+
+
+def _tool(name, description):
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": description,
+            "parameters": {"type": "object", "properties": {"limit": {"type": "integer"}}},
+        },
+    }
+
+
+CANDIDATES = [
+    _tool("slack.slack_get_users", "List users in the slack workspace"),
+    _tool("slack.slack_post_message", "Post a message to a slack channel"),
+    _tool("youtube.get_transcript", "Get the transcript of a youtube video"),
+    _tool("youtube.search", "Search youtube for videos"),
+]
+
+
+def test_select_tools_ranks_by_relevance():
+    selected = asyncio.run(toolselect.select_tools(
+        "summarize the transcript of this video", CANDIDATES, {"top_k": 2}
+    ))
+    names = [tool["function"]["name"] for tool in selected]
+    assert len(names) == 2
+    assert names[0] == "youtube.get_transcript"
+
+
+def test_select_tools_keeps_everything_without_a_match():
+    selected = asyncio.run(toolselect.select_tools(
+        "hello there", CANDIDATES, {"top_k": 2}
+    ))
+    assert selected is CANDIDATES, "No lexical match should fall back to the full set"
+
+
+def test_select_tools_skips_small_sets():
+    selected = asyncio.run(toolselect.select_tools(
+        "list slack users", CANDIDATES[:2], {"top_k": 5}
+    ))
+    assert selected == CANDIDATES[:2]
+
+
+def test_select_tools_falls_back_when_embeddings_fail():
+    settings = {"top_k": 2, "method": "embeddings", "embedding_model": "nomic-embed-text"}
+    with patch("jarbas.llms.aembed", side_effect=limiter.QueueFullError("busy")):
+        selected = asyncio.run(toolselect.select_tools("list slack users", CANDIDATES, settings))
+    assert selected is CANDIDATES, "A failed embedding should send the full set"
+
+    selected = asyncio.run(toolselect.select_tools(
+        "list slack users", CANDIDATES, {"top_k": 2, "method": "embeddings"}
+    ))
+    assert selected is CANDIDATES, "A missing embedding_model should send the full set"